@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+CENTS = 100  # ledger amounts are stored as integer cents
+
+# Display name -> (thousands separator, decimal separator)
+NUMBER_FORMATS = {
+    "1.234,56": (".", ","),
+    "1,234.56": (",", "."),
+}
+
+
+def parse_amounts(values, thousands=".", decimal=","): #Model
+    """Clean a whole column of number strings at once, like FinancialApp.clean_number does per cell.
+
+    Returns the parsed floats and how many non-empty cells could not be parsed (those become NaN).
+    """
+    text = values.astype(str).str.replace(r"[^\d\.,]", "", regex=True)
+    text = text.str.replace(thousands, "", regex=False)
+    if decimal != ".":
+        text = text.str.replace(decimal, ".", regex=False)
+    parsed = pd.to_numeric(text, errors="coerce").astype(float)
+    failed = int((parsed.isna() & values.notna()).sum())
+    return parsed, failed
+
+
+def to_cents(values): #Model
+    """Convert parsed amounts to exact integer cents, keeping missing amounts as <NA>."""
+    return values.mul(CENTS).round().astype("Int64")
+
+
+def to_units(data, columns): #Model
+    """Return `data` with the cent `columns` converted back to float amounts for display, missing ones as NaN."""
+    columns = [column for column in dict.fromkeys(columns) if column is not None and column in data.columns]
+    return data.assign(**{column: data[column].to_numpy(dtype=float, na_value=np.nan) / CENTS for column in columns})
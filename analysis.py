@@ -0,0 +1,134 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from amounts import CENTS, to_units
+from chart_data import build_chart_data
+from ledger import LedgerAggregates
+from outliers import ExpenseScores
+from windows import DailyLedger, WindowIndex
+
+PERIODS = (7, 15, 30, 180)  # comparison windows in days
+DAYS_PER_MONTH = 30.437  # average days per month
+
+
+class StatementAnalysis: #Model
+    """Every number the dashboard shows for a cleaned statement, without any Streamlit calls.
+
+    `columns` maps the roles date, debit, credit, balance, category and description to column names,
+    as returned by FinancialApp.statement_columns. `data` is a compact ledger with amounts in integer
+    cents, as returned by parse_statement; every metric is in currency units. The metrics only read the
+    daily and chart totals in `aggregates`, which are built from `data` unless given, e.g. by a LedgerStore.
+    Every sum is taken in integer cents, so totals are exact, and divided by CENTS only for the result.
+    """
+
+    def __init__(self, data, columns, today=None, savings=0, periods=PERIODS, aggregates=None):
+        self.data = data
+        self.columns = columns
+        self.today = pd.Timestamp("today").normalize() if today is None else pd.Timestamp(today).normalize()
+        self.savings = savings
+        date, debit, credit, balance = columns["date"], columns["debit"], columns["credit"], columns["balance"]
+        self.aggregates = LedgerAggregates.from_data(data, columns) if aggregates is None else aggregates
+        daily = self.aggregates.daily
+
+        # Window totals for the comparison periods, all answered from one prefix-sum index over the days
+        self.windows = WindowIndex(daily.reset_index(), date, [debit, credit])
+        # Day-by-day curves for the same periods are cut from one daily ledger on request
+        self.daily = DailyLedger(None, date, debit, credit, balance, daily=daily)
+
+        self.current_month = self.today.strftime("%Y-%m")
+        month_start = self.today.to_period("M").start_time
+        month_end = month_start + pd.offsets.MonthBegin()
+        earnings = self.windows.sum(credit, month_start, month_end)
+        expenses = self.windows.sum(debit, month_start, month_end)
+        self.earnings, self.expenses, self.balance = earnings / CENTS, expenses / CENTS, (earnings - expenses) / CENTS
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.avg_expenses = np.int64(daily[debit].sum()) / np.int64(daily["debit_count"].sum()) * DAYS_PER_MONTH / CENTS
+        self.recommended_salary = self.avg_expenses + savings
+        self.periods = {}
+        for days in periods:
+            period_expenses, previous_expenses, delta_expenses = self.windows.compare(debit, self.today, days)
+            period_earnings, previous_earnings, delta_earnings = self.windows.compare(credit, self.today, days)
+            self.periods[days] = {
+                "expenses": period_expenses / CENTS,
+                "previous_expenses": previous_expenses / CENTS,
+                "delta_expenses": delta_expenses,
+                "earnings": period_earnings / CENTS,
+                "previous_earnings": previous_earnings / CENTS,
+                "delta_earnings": delta_earnings,
+            }
+        self._chart_totals = None
+        self._chart_data = None
+        self._expense_scores = None
+
+    def period_curves(self, days):
+        """Return the day-by-day curves of the `days` before today and the `days` before that, in currency units."""
+        return tuple(to_units(window, [self.columns["debit"], self.columns["credit"]]) for window in self.daily.period(self.today, days))
+
+    def chart_data(self):
+        """Return the chart aggregates in currency units, built on first use."""
+        if self._chart_data is None:
+            debit, credit = self.columns["debit"], self.columns["credit"]
+            self._chart_data = {name: to_units(frame, frame.columns if name == "cumulative_expenses_by_month" else [debit, credit])
+                                for name, frame in self._chart_cents().items()}
+        return self._chart_data
+
+    def _chart_cents(self):
+        if self._chart_totals is None:
+            self._chart_totals = build_chart_data(None, self.columns["date"], self.columns["debit"], self.columns["credit"],
+                                                  self.columns["category"], totals=self.aggregates.totals)
+        return self._chart_totals
+
+    def expense_scores(self):
+        """Return how unusual every expense is for its category, scored on first use."""
+        if self._expense_scores is None:
+            self._expense_scores = ExpenseScores(self.data, self.columns["debit"], self.columns["category"])
+        return self._expense_scores
+
+    def outliers(self, limit):
+        """Return the `limit` most unusual expenses for their category, most unusual first, with amounts in cents like the ledger."""
+        return self.expense_scores().top(self.data, limit)
+
+    def summary(self):
+        """Return the dashboard metrics as a JSON-serializable dict."""
+        chart_data = self._chart_cents()
+        date, debit, credit, category = self.columns["date"], self.columns["debit"], self.columns["credit"], self.columns["category"]
+        expenses_by_month = chart_data["expenses_by_category_month"].groupby(date)[debit].sum()
+        return {
+            "rows": len(self.data),
+            "first_date": _number(self.data[date].min()),
+            "last_date": _number(self.data[date].max()),
+            "today": self.today.strftime("%Y-%m-%d"),
+            "current_month": self.current_month,
+            "earnings": _number(self.earnings),
+            "expenses": _number(self.expenses),
+            "balance": _number(self.balance),
+            "average_monthly_expenses": _number(self.avg_expenses),
+            "recommended_salary": _number(self.recommended_salary),
+            "outliers": self.expense_scores().count(),
+            "periods": {str(days): {key: _number(value) for key, value in period.items()} for days, period in self.periods.items()},
+            "expenses_by_category": {str(key): _number(value / CENTS) for key, value in chart_data["expenses_by_category"].set_index(category)[debit].items()},
+            "expenses_by_month": {key: _number(value / CENTS) for key, value in expenses_by_month.items()},
+            "earnings_by_month": {key: _number(value / CENTS) for key, value in chart_data["earnings_by_month"].set_index(date)[credit].items()},
+        }
+
+
+def group_by_time(data, date_column, time): #Model
+    """Group the data by the specified time period."""
+    return data.groupby(pd.Grouper(key=date_column, freq=time)).sum(numeric_only=True)
+
+
+def group_by_category(data, category_column): #Model
+    """Group the data by category."""
+    return data.groupby(category_column, observed=True).sum(numeric_only=True)
+
+
+def _number(value):
+    """Convert numpy scalars and timestamps to JSON values, with NaN and infinite deltas as None."""
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    if value is None or pd.isna(value):
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
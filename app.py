@@ -3,17 +3,34 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objs as go
-from datetime import datetime
-import datetime as dt
-import math
+from concurrent.futures import ThreadPoolExecutor
+import os
 import re
-import chardet
+import time
 import openai
+from analysis import PERIODS, StatementAnalysis, group_by_category, group_by_time
+from plotting import CHART_MODES, cumulative_figure
+from amounts import NUMBER_FORMATS, to_units
+from dates import AUTO
+from ingest import LEDGER_LAYOUT, bytes_per_row, detect_encoding, merge_statements, parse_statements, read_header
+from statement_cache import statement_cache
+from llm import AnswerStreams, fingerprint, response_cache
+from prompts import MAP_PROMPT, MAP_SUMMARY_TOKENS, build_context, describe_report, estimate_tokens, outlier_context, transaction_chunks
+from diagnostics import Tracer, profiled
+from ledger import LedgerStore
+from outliers import OUTLIER_THRESHOLD, SCORE_COLUMN, TYPICAL_COLUMN
+from categorizer import DEFAULT_RULES, GPT_BATCH, Categorizer, category_prompt, format_rules, parse_category_answer, parse_rules
 
 st.set_page_config(page_title="GPT Bank statement analyzer", page_icon="🐈", layout="wide")
 
 st.session_state = None
 
+NO_CATEGORY = "(none, categorize from the descriptions)"
+MAX_GPT_MERCHANTS = 500  # most frequent unmatched merchants sent to GPT for a category
+OUTLIER_LIMIT = 100  # most unusual expenses shown
+OUTLIER_PAGE = 20  # rows per page of the unusual expenses table
+PROMPT_OUTLIERS = 25  # most unusual expenses sent to GPT
+
 class FinancialApp:
     def __init__(self):
         self.data = None
@@ -24,54 +41,160 @@ class FinancialApp:
         self.credit_column = None
         self.balance_column = None
         self.category_column = None
-        self.date_format = '%d-%b-%Y'
-        self.file = None
+        self.description_column = None
+        self.date_format = AUTO
+        self.number_format = '1.234,56'
+        self.parse_failures = {}
+        self.files = []
+        self.encoding = None
         self.cat = None
         self.savings = None
         self.today = pd.Timestamp("today").normalize()
+        self.refresh_gpt = False
+        self.map_reduce = False
+        self.chart_mode = 'Auto'
+        # Add uploads to a ledger saved on disk and update its totals instead of recomputing them
+        self.incremental = False
+        self.history_name = 'default'
+        self.aggregates = None
+        # Categories filled in from the descriptions where the statement has none
+        self.fill_categories = False
+        self.category_rules = DEFAULT_RULES
+        self.categorize_with_gpt = False
+        self.gpt_api_key = None
+        # Anything with a ChatCompletion-style create() works here, e.g. a stub for offline testing
+        self.completion_client = openai.ChatCompletion
+        self.response_cache = response_cache
+        # Wall time, rows and memory change of every stage of this run
+        self.tracer = Tracer()
+        self.show_diagnostics = False
+        self.deep_profile = False
 
     def get_encoding(self, file): #Model
-        """Detect the encoding of a file."""
-        result = chardet.detect(file.read())
-        return result['encoding']
-
-    def read_csv(self, file, delimiter, encoding): #Model
-        """Read a CSV file with the specified delimiter and encoding."""
-        file.seek(0)
-        return pd.read_csv(file, delimiter=delimiter, encoding=encoding)
+        """Detect the encoding of a file from a sample of its bytes."""
+        with self.tracer.stage("detect encoding"):
+            return detect_encoding(file)
 
-    def detect_headers(self): #Model
+    def detect_headers(self, file, delimiter, encoding): #Model
         """Detect the headers of the CSV file."""
-        return list(self.data.columns)
+        with self.tracer.stage("read headers"):
+            return read_header(file, delimiter, encoding)
     
-    def process_dates(self, start_date, end_date): #Model
-        """Process the dates and return filtered data to display comparative graphs."""
-        self.data[self.date_column] = pd.to_datetime(self.data[self.date_column], format="%Y-%m-%d")
-        # Filter the data to the specified date range
-        filtered_data = self.data[(self.data[self.date_column] >= start_date) & (self.data[self.date_column] <= end_date)]
-        # Create a date range
-        date_range = pd.date_range(start_date, end_date)
-        # Merge the data with the date range to fill in missing dates
-        filtered_data = filtered_data.merge(pd.DataFrame({self.date_column: date_range}), how="right", on=self.date_column).fillna({self.debit_column: 0})
-        filtered_data = filtered_data.merge(pd.DataFrame({self.date_column: date_range}), how="right", on=self.date_column).fillna({self.credit_column: 0})
-        # Convert the debit and credit columns to integers
-        filtered_data[self.debit_column] = filtered_data[self.debit_column].astype(int)
-        filtered_data[self.credit_column] = filtered_data[self.credit_column].astype(int)
-        # Add a column for the day
-        filtered_data["day"] = (filtered_data[self.date_column] - start_date).dt.days + 1
-        # Calculate the cumulative sum
-        filtered_data[self.debit_column] = filtered_data[self.debit_column].cumsum()  # Calculate the cumulative sum
-        filtered_data[self.credit_column] = filtered_data[self.credit_column].cumsum()  # Calculate the cumulative sum
-        return filtered_data
-
     def process_data(self): #Model
-        """Process the data in the CSV file."""
-        self.data[self.date_column] = pd.to_datetime(self.data[self.date_column], format=self.date_format)
-        self.data[self.debit_column] = self.data[self.debit_column].apply(self.clean_number)
-        self.data[self.credit_column] = self.data[self.credit_column].apply(self.clean_number)
-        self.data[self.balance_column] = self.data[self.balance_column].apply(self.clean_number)
+        """Process the data in the CSV files."""
+        amount_columns = self.amount_columns()
+        # Reuse the cleaned ledger if these exact files were already processed with the same settings
+        key = statement_cache.key(self.files, layout=LEDGER_LAYOUT, delimiter=self.delimiter, date_format=self.date_format, number_format=self.number_format,
+                                  columns=[self.date_column, self.debit_column, self.credit_column, self.balance_column, self.category_column, self.description_column])
+        with self.tracer.stage("statement cache") as stage:
+            self.data = statement_cache.get(key)
+            stage["rows"] = None if self.data is None else len(self.data)
+        if self.data is None:
+            self.data = self.read_statements(self.files, amount_columns)
+            statement_cache.put(key, self.data)
+        if self.fill_categories or self.category_column is None:
+            self.categorize()
+        if self.incremental:
+            self.append_to_history()
         self.show_summary()
 
+    def categorize(self): #Model
+        """Fill in the category column from the descriptions, asking GPT only about the distinct merchants the rules miss."""
+        if self.category_column is None:
+            self.category_column = "Category" if "Category" not in self.data.columns else "Auto category"
+        existing = self.data[self.category_column] if self.category_column in self.data.columns else None
+        categorizer = Categorizer(self.category_rules)
+        with self.tracer.stage("categorize", rows=len(self.data)):
+            categories, report = categorizer.categorize(self.data[self.description_column], existing)
+            if self.categorize_with_gpt and self.gpt_api_key and len(report["unmatched"]):
+                categorizer.learn(self.ask_gpt_categories(list(report["unmatched"].index[:MAX_GPT_MERCHANTS]), categorizer.categories()))
+                categories, report = categorizer.categorize(self.data[self.description_column], existing)
+        self.data = self.data.assign(**{self.category_column: categories})
+        with st.sidebar:
+            st.caption(f"Categorized {report['coverage']:.1%} of the transactions ({report['matched_merchants']} of {report['merchants']} merchants) "
+                       f"in {report['seconds']:.2f} s")
+            if len(report["unmatched"]):
+                with st.expander("Merchants without a category"):
+                    st.dataframe(report["unmatched"].head(100).rename("transactions"), use_container_width=True)
+
+    def ask_gpt_categories(self, merchants, categories): #Model
+        """Ask GPT for the category of each merchant name, GPT_BATCH names per request and a few requests at a time."""
+        openai.api_key = self.gpt_api_key
+        model_engine = "gpt-3.5-turbo"
+        def ask(batch):
+            prompt = category_prompt(batch, categories)
+            key = self.response_cache.key(model_engine, 0, prompt, "")
+            answer = None if self.refresh_gpt else self.response_cache.get(key)
+            if answer is None:
+                response = self.completion_client.create(
+                    model=model_engine,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=20 * len(batch),
+                    temperature=0
+                )
+                answer = response['choices'][0]['message']['content']
+                self.response_cache.put(key, answer)
+            return parse_category_answer(answer, batch, categories)
+        learned = {}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for answer in executor.map(ask, [merchants[start:start + GPT_BATCH] for start in range(0, len(merchants), GPT_BATCH)]):
+                learned.update(answer)
+        return learned
+
+    def append_to_history(self): #Model
+        """Add the new transactions to the saved history and continue with the whole history and its updated totals."""
+        history = LedgerStore(self.history_name)
+        with self.tracer.stage("append to history") as stage:
+            report = history.append(self.data, self.statement_columns(), self.key_columns())
+            stage["rows"] = report["added"]
+        with self.tracer.stage("load history") as stage:
+            self.data = history.transactions()
+            self.aggregates = history.aggregates()
+            stage["rows"] = len(self.data)
+        with st.sidebar:
+            st.caption(f"History '{self.history_name}': added {report['added']} of {report['rows']} transactions, "
+                       f"{report['duplicates']} were already saved ({report['overlap_days']} overlapping days)")
+            if report["gap_days"]:
+                st.warning(f"There are {report['gap_days']} days between the saved history and the new statement.")
+            if report["balance_gap"]:
+                st.warning(f"The balance does not continue the saved history; it is off by {self.currency}{report['balance_gap']:,.2f}. Some transactions may be missing.")
+
+    def read_statements(self, files, amount_columns): #Model
+        """Read and clean every uploaded file in parallel and merge them into one ledger without duplicates."""
+        thousands, decimal = NUMBER_FORMATS[self.number_format]
+        with self.tracer.stage("parse statements") as stage:
+            results = parse_statements([(file.name, file.getvalue()) for file in files], self.delimiter, self.date_column, self.date_format, amount_columns, thousands, decimal,
+                                       [self.description_column, self.category_column])
+            stage["rows"] = sum(result["rows"] for result in results)
+        key_columns = self.key_columns()
+        start = time.perf_counter()
+        with self.tracer.stage("merge statements") as stage:
+            data, duplicates = merge_statements([result["data"] for result in results], key_columns, self.date_column)
+            stage["rows"] = len(data)
+        merge_seconds = time.perf_counter() - start
+        self.parse_failures = {column: sum(result["parse_failures"].get(column, 0) for result in results) for column in amount_columns}
+        raw = [result["bytes_per_row"]["raw"] for result in results]
+        with st.sidebar:
+            if any(self.parse_failures.values()):
+                st.warning(f"Some amounts could not be read and were left empty: {self.parse_failures}")
+            if self.date_format == AUTO:
+                st.caption("Dates read as " + ", ".join(sorted({str(result["date_format"]) for result in results})))
+            if None not in raw:
+                raw = sum(size * result["rows"] for size, result in zip(raw, results)) / max(sum(result["rows"] for result in results), 1)
+                st.caption(f"Memory per transaction: {raw:,.0f} bytes as read, {bytes_per_row(data):,.0f} bytes in the compact ledger")
+            if len(results) > 1:
+                st.caption(f"Merged {len(results)} files in {merge_seconds:.2f} s, dropped {duplicates} duplicate transactions")
+                st.dataframe(pd.DataFrame([{key: result[key] for key in ("name", "rows", "encoding", "date_format", "seconds")} for result in results]), use_container_width=True)
+        return data
+
+    def amount_columns(self): #Model
+        """Return the debit, credit and balance columns, which the ledger keeps in cents."""
+        return list(dict.fromkeys([self.debit_column, self.credit_column, self.balance_column]))
+
+    def key_columns(self): #Model
+        """Return the columns that identify a transaction when statements overlap."""
+        return list(dict.fromkeys(column for column in (self.date_column, self.debit_column, self.credit_column, self.description_column, self.balance_column) if column is not None))
+
     def clean_number(self, num): #Model
         """Clean a number string by removing non-numeric characters and converting it to a float."""
         try:
@@ -81,48 +204,98 @@ class FinancialApp:
             return np.nan
         
     def ask_gpt(self, api_key, prompt, data): #Model
-        """Send a query to the GPT API and return the response."""
+        """Send a query to the GPT API and return the full response."""
+        return "".join(self.stream_gpt(api_key, prompt, data))
+
+    def stream_gpt(self, api_key, prompt, data, report=None, context=None): #Model
+        """Send a query to the GPT API and yield the response as it streams in, or a cached answer for the same prompt and data at once.
+
+        The statement is sent as a compact summary that fits the token budget, or instead `context`, a function
+        of the token budget returning a text and report like build_context; what was included is written to `report`.
+        """
         openai.api_key = api_key
         model_engine = "gpt-3.5-turbo"
+        temperature = 0.9
         max_tokens = 4096 - 1689  # Maximum tokens allowed minus 1 for the API
-
-        # Convert bank statement data to a readable string
-        if data is None:
-            statement_str = ""
+        report = {} if report is None else report
+
+        key = self.response_cache.key(model_engine, temperature, prompt, f"{fingerprint(data)}:{self.map_reduce}:{context is not None}")
+        if not self.refresh_gpt:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                report["cached"] = True
+                yield cached
+                return
+
+        # Calculate the remaining tokens available for the statement
+        available_tokens = max_tokens - estimate_tokens(prompt)
+        columns = self.statement_columns()
+        if context is not None:
+            statement_str, included = context(available_tokens)
         else:
-            statement_str = data.to_string(index=False)
-
-        # Calculate the number of tokens in the prompt
-        prompt_tokens = math.ceil(len(prompt) / 4)
-
-        # Calculate the remaining tokens available for statement_str
-        available_tokens = max_tokens - prompt_tokens
+            statement_str, included = build_context(data, columns, available_tokens)
 
-        # Truncate statement_str to fit within the available tokens
-        truncated_statement_str = statement_str[:available_tokens * 4]
+        # If the summary had to leave rows out, optionally have every chunk of transactions summarized first
+        summaries = []
+        if self.map_reduce and context is None and not included["complete"]:
+            summaries = self.summarize_chunks(model_engine, transaction_chunks(data, columns, max_tokens - estimate_tokens(MAP_PROMPT)))
+            summaries_str = "\n".join(f"- {summary}" for summary in summaries)
+            statement_str, included = build_context(data, columns, available_tokens - estimate_tokens(summaries_str))
+            statement_str = f"{statement_str}\n\nSummaries of all transactions, most recent first:\n{summaries_str}"
+        report.update(included, chunks=len(summaries))
 
         # Create the GPT prompt
-        full_prompt = f"{prompt}\n{truncated_statement_str}\n"
+        full_prompt = f"{prompt}\n{statement_str}\n"
 
         # Call the GPT API
-        response = openai.ChatCompletion.create(
+        response = self.completion_client.create(
             model=model_engine,
             messages=[{"role": "user", "content": full_prompt}],
             max_tokens=540,
-            temperature=0.9
+            temperature=temperature,
+            stream=True
         )
 
-        # Return the response
-        output_text = response['choices'][0]['message']['content']
-        return output_text
+        # Yield the response tokens as they arrive
+        tokens = []
+        for chunk in response:
+            token = chunk['choices'][0]['delta'].get('content')
+            if token:
+                tokens.append(token)
+                yield token
+        self.response_cache.put(key, "".join(tokens))
+
+    def summarize_chunks(self, model_engine, chunks): #Model
+        """Ask GPT for a short summary of each chunk of transactions, a few at a time."""
+        def summarize(chunk):
+            response = self.completion_client.create(
+                model=model_engine,
+                messages=[{"role": "user", "content": f"{MAP_PROMPT}\n{chunk}\n"}],
+                max_tokens=MAP_SUMMARY_TOKENS,
+                temperature=0
+            )
+            return response['choices'][0]['message']['content'].strip()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return list(executor.map(summarize, chunks))
+
+    def statement_columns(self): #Model
+        """Return the matched column names by role."""
+        return {
+            "date": self.date_column,
+            "debit": self.debit_column,
+            "credit": self.credit_column,
+            "balance": self.balance_column,
+            "category": self.category_column,
+            "description": self.description_column,
+        }
 
     def group_by_time(self, time): #Model
         """Group the data by the specified time period."""
-        return self.data.groupby(pd.Grouper(key=self.date_column, freq=time)).sum()
+        return group_by_time(self.data, self.date_column, time)
     
     def group_by_category(self): #Model
         """Group the data by category."""
-        return self.data.groupby(self.category_column).sum()
+        return group_by_category(self.data, self.category_column)
     
     def match_columns(self, headers): #Controller
         """Match the columns in the CSV file to the required columns."""
@@ -131,7 +304,9 @@ class FinancialApp:
         self.debit_column = st.selectbox("Select the debit column", headers)
         self.credit_column = st.selectbox("Select the credit column", headers)
         self.balance_column = st.selectbox("Select the balance column", headers)
-        self.category_column = st.selectbox("Select the category column", headers)
+        self.category_column = st.selectbox("Select the category column", headers + [NO_CATEGORY])
+        if self.category_column == NO_CATEGORY:
+            self.category_column = None
         self.description_column = st.selectbox("Select the description column", headers)
         return self.date_column, self.debit_column, self.credit_column, self.balance_column, self.category_column, self.description_column
     
@@ -148,26 +323,48 @@ class FinancialApp:
                 self.delimiter = st.text_input("Delimiter (default ';')", value=";")
                 self.currency = st.text_input("Currency (default '€')", value="€")
                 self.savings = st.number_input(f"How much money do you want to save every month? (default {self.currency}1000)", value=1000)
-                self.date_format = st.text_input("Date format (default '%d-%m-%Y')", value="%d-%m-%Y")
+                self.date_format = st.text_input("Date format ('auto' to detect it, or e.g. '%d-%m-%Y')", value=AUTO)
+                self.number_format = st.selectbox("Number format", list(NUMBER_FORMATS))
+                self.chart_mode = st.selectbox("Transaction chart detail", CHART_MODES, help="Auto switches to bucketed bars and a downsampled WebGL balance line for large statements.")
                 self.gpt_api_key = st.text_input("Optional: Enter your OpenAI GPT API key", type="password")
-            self.file = st.file_uploader("Upload your CSV file", type=['csv'])
-
-        if self.file is not None:
+                self.refresh_gpt = st.checkbox("Refresh GPT answers (ignore cached ones)")
+                self.map_reduce = st.checkbox("Summarize large statements in chunks first (more GPT calls)")
+                self.incremental = st.checkbox("Add the uploads to a saved history", help="Only transactions that are not saved yet are added, and the saved totals are updated instead of recomputed.")
+                if self.incremental:
+                    self.history_name = st.text_input("History name", value="default")
+                    if st.button("Clear saved history"):
+                        LedgerStore(self.history_name).clear()
+                self.show_diagnostics = st.checkbox("Show stage timings")
+                self.deep_profile = st.checkbox("Profile the next run with cProfile", help="Slower; the profile can be downloaded from the Diagnostics panel.")
+            self.files = st.file_uploader("Upload your CSV files", type=['csv'], accept_multiple_files=True)
+
+        if self.files:
             try:
-                encoding = self.get_encoding(self.file)
-                self.data = self.read_csv(self.file, self.delimiter, encoding)                
-                headers = self.detect_headers()
+                # The files are expected to share one layout, so the columns are matched on the first one
+                self.encoding = self.get_encoding(self.files[0])
+                headers = self.detect_headers(self.files[0], self.delimiter, self.encoding)
                 with st.sidebar:
                     with st.expander("Match columns", expanded=True):
                         self.match_columns(headers)
+                    with st.expander("Categories", expanded=self.category_column is None):
+                        self.fill_categories = st.checkbox("Fill in missing categories from the descriptions", value=self.category_column is None,
+                                                           disabled=self.category_column is None)
+                        self.category_rules = parse_rules(st.text_area("Rules, one category per line as 'Category: keyword, keyword'",
+                                                                       value=format_rules(DEFAULT_RULES), height=200))
+                        self.categorize_with_gpt = st.checkbox("Ask GPT about merchants the rules miss (needs the API key)")
 
                     # Ask for OpenAI GPT API key
                     process = st.button("Process")
 
                 if process:
                     st.session_state = True
-                    with st.spinner("Processing data..."):
+                    with st.spinner("Processing data..."), profiled(self.deep_profile) as profile:
                         self.process_data()
+                    with st.sidebar:
+                        st.caption(f"Statement cache: {statement_cache.hits} hits, {statement_cache.misses} misses")
+                        st.caption(f"GPT answer cache: {self.response_cache.hits} hits, {self.response_cache.misses} misses")
+                        if self.show_diagnostics or profile:
+                            self.show_stage_timings(profile)
 
             except Exception as e:
                 with st.sidebar:
@@ -177,93 +374,66 @@ class FinancialApp:
         elif st.session_state:
             self.cat = st.empty()
 
+    def show_stage_timings(self, profile): #View
+        """Show the timings of this run and, if it was profiled, the cProfile report and a download of the raw profile."""
+        with st.expander("Diagnostics", expanded=True):
+            timings = pd.DataFrame(self.tracer.records, columns=["stage", "seconds", "rows", "memory_delta"])
+            timings["memory_delta"] = timings["memory_delta"] / 2**20
+            st.dataframe(timings.rename(columns={"memory_delta": "memory change (MiB)"}), use_container_width=True)
+            st.caption(f"Run {self.tracer.run_id}, also written to {self.tracer.directory}")
+            if profile:
+                with open(profile["path"], "rb") as file:
+                    st.download_button("Download cProfile stats", file.read(), file_name=os.path.basename(profile["path"]))
+                st.code(profile["report"])
+
     def show_summary(self): #View
         """Show a summary of the financial data."""
         st.header("Summary")
 
-        current_month = datetime.now().strftime("%Y-%m")
-        current_month_data = self.data[self.data[self.date_column].dt.to_period('M') == current_month]
-        earnings = current_month_data[self.credit_column].sum()
-        expenses = current_month_data[self.debit_column].sum()
-        balance = earnings - expenses
-        self.avg_expenses = self.data[self.debit_column].mean() * 30.437  # Assuming 30.437 days average per month
-        self.recommended_salary = self.avg_expenses + self.savings  # Assuming a 25% buffer
-
-        # Calculate time deltas
-        self.last_7_days = self.today - pd.Timedelta(days=7)
-        self.previous_7_days = self.last_7_days - pd.Timedelta(days=7)
-        self.last_15_days = self.today - pd.Timedelta(days=15)
-        self.previous_15_days = self.last_15_days - pd.Timedelta(days=15)
-        self.last_30_days = self.today - pd.Timedelta(days=30)
-        self.previous_30_days = self.last_30_days - pd.Timedelta(days=30)
-        self.last_180_days = self.today - pd.Timedelta(days=180)
-        self.previous_180_days = self.last_180_days - pd.Timedelta(days=180)
-        
-        # Calculate value deltas
-        self.delta_expenses_7 = 1/(self.data[(self.data[self.date_column] >= self.previous_7_days) & (self.data[self.date_column] < self.last_7_days)][self.debit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_7_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum())-1
-        self.delta_earnings_7 = 1/(self.data[(self.data[self.date_column] >= self.previous_7_days) & (self.data[self.date_column] < self.last_7_days)][self.credit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_7_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum())-1
-        self.delta_expenses_15 = 1/(self.data[(self.data[self.date_column] >= self.previous_15_days) & (self.data[self.date_column] < self.last_15_days)][self.debit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_15_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum())-1
-        self.delta_earnings_15 = 1/(self.data[(self.data[self.date_column] >= self.previous_15_days) & (self.data[self.date_column] < self.last_15_days)][self.credit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_15_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum())-1
-        self.delta_expenses_30 = 1/(self.data[(self.data[self.date_column] >= self.previous_30_days) & (self.data[self.date_column] < self.last_30_days)][self.debit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_30_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum())-1
-        self.delta_earnings_30 = 1/(self.data[(self.data[self.date_column] >= self.previous_30_days) & (self.data[self.date_column] < self.last_30_days)][self.credit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_30_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum())-1
-        self.delta_expenses_180 = 1/(self.data[(self.data[self.date_column] >= self.previous_180_days) & (self.data[self.date_column] < self.last_180_days)][self.debit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_180_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum())-1
-        self.delta_earnings_180 = 1/(self.data[(self.data[self.date_column] >= self.previous_180_days) & (self.data[self.date_column] < self.last_180_days)][self.credit_column].sum())*(self.data[(self.data[self.date_column] >= self.last_180_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum())-1
-        
-        # Filtered data
-        self.data_last_7_days = self.process_dates(self.last_7_days, self.today)
-        self.data_previous_7_days = self.process_dates(self.previous_7_days, self.last_7_days)
-        self.data_last_15_days = self.process_dates(self.last_15_days, self.today)
-        self.data_previous_15_days = self.process_dates(self.previous_15_days, self.last_15_days)
-        self.data_last_30_days = self.process_dates(self.last_30_days, self.today)
-        self.data_previous_30_days = self.process_dates(self.previous_30_days, self.last_30_days)
-        self.data_last_180_days = self.process_dates(self.last_180_days, self.today)
-        self.data_previous_180_days = self.process_dates(self.previous_180_days, self.last_180_days)
-
-        # Calculat sum of earnings and expenses
-        self.earnings_last_7_days = self.data[(self.data[self.date_column] >= self.last_7_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()
-        self.expenses_last_7_days = self.data[(self.data[self.date_column] >= self.last_7_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()
-        self.earnings_previous_7_days = self.data[(self.data[self.date_column] >= self.previous_7_days) & (self.data[self.date_column] < self.last_7_days)][self.credit_column].sum()
-        self.expenses_previous_7_days = self.data[(self.data[self.date_column] >= self.previous_7_days) & (self.data[self.date_column] < self.last_7_days)][self.debit_column].sum()
-        self.earnings_last_15_days = self.data[(self.data[self.date_column] >= self.last_15_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()
-        self.expenses_last_15_days = self.data[(self.data[self.date_column] >= self.last_15_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()
-        self.earnings_previous_15_days = self.data[(self.data[self.date_column] >= self.previous_15_days) & (self.data[self.date_column] < self.last_15_days)][self.credit_column].sum()
-        self.expenses_previous_15_days = self.data[(self.data[self.date_column] >= self.previous_15_days) & (self.data[self.date_column] < self.last_15_days)][self.debit_column].sum()
-        self.earnings_last_30_days = self.data[(self.data[self.date_column] >= self.last_30_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()
-        self.expenses_last_30_days = self.data[(self.data[self.date_column] >= self.last_30_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()
-        self.earnings_previous_30_days = self.data[(self.data[self.date_column] >= self.previous_30_days) & (self.data[self.date_column] < self.last_30_days)][self.debit_column].sum()
-        self.expenses_previous_30_days = self.data[(self.data[self.date_column] >= self.previous_30_days) & (self.data[self.date_column] < self.last_30_days)][self.credit_column].sum()
-        self.earnings_last_180_days = self.data[(self.data[self.date_column] >= self.last_180_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()
-        self.expenses_last_180_days = self.data[(self.data[self.date_column] >= self.last_180_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()
-        self.earnings_previous_180_days = self.data[(self.data[self.date_column] >= self.previous_180_days) & (self.data[self.date_column] < self.last_180_days)][self.debit_column].sum()
-        self.expenses_previous_180_days = self.data[(self.data[self.date_column] >= self.previous_180_days) & (self.data[self.date_column] < self.last_180_days)][self.credit_column].sum()
+        with self.tracer.stage("analysis", rows=len(self.data)):
+            self.analysis = StatementAnalysis(self.data, self.statement_columns(), self.today, self.savings, aggregates=self.aggregates)
+        current_month = self.analysis.current_month
+        earnings, expenses, balance = self.analysis.earnings, self.analysis.expenses, self.analysis.balance
+        self.avg_expenses = self.analysis.avg_expenses
+        self.recommended_salary = self.analysis.recommended_salary
+        # Add the day-by-day curves of each comparison period for the charts
+        self.periods = {}
+        with self.tracer.stage("period curves", rows=len(self.analysis.daily.frame)):
+            for days, period in self.analysis.periods.items():
+                period_data, previous_data = self.analysis.period_curves(days)
+                self.periods[days] = dict(period, data=period_data, previous_data=previous_data)
 
         col1, col2 = st.columns(2)
     
+        # GPT answers are requested in the background and streamed into their panels once the charts are drawn
+        self.answers = AnswerStreams()
+        self.answer_panels = {}
+        self.context_reports = {}
         if self.gpt_api_key:
-            # Call GPT API
-            with st.spinner("Calling OpeanAI's GPT API..."):
-                response = self.ask_gpt(self.gpt_api_key, f'''
+            st.info("🐱💬 Wally's overview")
+            self.answer_panels["overview"] = st.empty()
+            self.answer_panels["overview"].info("Wally is thinking...")
+            self.context_reports["overview"] = {}
+            self.answers.submit("overview", self.stream_gpt, self.gpt_api_key, f'''
                 You are a bank statement financial analist. What can you tell me about my bank statement below? Also, consider the following:
                 1. The currency is {self.currency}
                 2. The current month is {current_month}
                 3. The earnings for the current month are {self.currency}{earnings:,.2f}
                 4. The expenses for the current month are {self.currency}{expenses:,.2f}
                 5. The balance for the current month is {self.currency}{balance:,.2f}
-                6. The earnings for the last 7 days are {self.currency}{self.earnings_last_7_days:,.2f}
-                7. The expenses for the last 7 days are {self.currency}{self.expenses_last_7_days:,.2f}
-                8. The earnings for the previous 7 days are {self.currency}{self.earnings_previous_7_days:,.2f}
-                9. The expenses for the previous 7 days are {self.currency}{self.expenses_previous_7_days:,.2f}
-                10. The earning growth for the last 7 days is {self.delta_earnings_7:,.2%}
-                11. The expense growth for the last 7 days is {self.delta_expenses_7:,.2%}
-                12. The earnings for the last 30 days are {self.currency}{self.earnings_last_30_days:,.2f}
-                13. The expenses for the last 30 days are {self.currency}{self.expenses_last_30_days:,.2f}
+                6. The earnings for the last 7 days are {self.currency}{self.periods[7]['earnings']:,.2f}
+                7. The expenses for the last 7 days are {self.currency}{self.periods[7]['expenses']:,.2f}
+                8. The earnings for the previous 7 days are {self.currency}{self.periods[7]['previous_earnings']:,.2f}
+                9. The expenses for the previous 7 days are {self.currency}{self.periods[7]['previous_expenses']:,.2f}
+                10. The earning growth for the last 7 days is {self.periods[7]['delta_earnings']:,.2%}
+                11. The expense growth for the last 7 days is {self.periods[7]['delta_expenses']:,.2%}
+                12. The earnings for the last 30 days are {self.currency}{self.periods[30]['earnings']:,.2f}
+                13. The expenses for the last 30 days are {self.currency}{self.periods[30]['expenses']:,.2f}
                 14. The recommended salary for the current month is {self.currency}{self.recommended_salary:,.2f}
                 Write a list of 5 recomendations based of the data, be specific, and include the numbers from the list above.
                 Write 2 forecasest based on these numbers, be specific, and include the numbers from the list above.
                 In your response introduce theories, concepts, and explain your reasoning.
-                ''', self.data)
-                st.info("🐱💬 Wally's overview")
-                st.info(response)
+                ''', self.data, self.context_reports["overview"])
         else:
             st.warning("You need to set your GPT API key in the config file to use this feature.")
         with col1:
@@ -285,145 +455,115 @@ class FinancialApp:
             with col8:
                 st.metric(value=f"{self.currency}{self.recommended_salary:,.2f}", delta=f"{self.savings / self.avg_expenses * 100:,.2f}%" , label="Recommended Salary")
         
-        # Calculate expenses larger than average
-        # filter the data to get the expenses larger than the average
-        expenses_larger_than_average = self.data[self.data[self.debit_column] > self.avg_expenses]
-        # sort the data by the debit column
-        expenses_larger_than_average = expenses_larger_than_average.sort_values(self.debit_column, ascending=False)
-
-
-        st.subheader("Expenses Larger than Average")
+        # Score every expense against its category and keep only the most unusual ones
+        with self.tracer.stage("outliers", rows=len(self.data)):
+            outliers = self.analysis.outliers(OUTLIER_LIMIT)
+            outlier_count = self.analysis.expense_scores().count()
+
+        st.subheader("Unusual Expenses")
+        st.caption(f"{outlier_count:,} expenses are more than {OUTLIER_THRESHOLD} typical deviations above the typical expense of their category; "
+                   f"the {len(outliers):,} most unusual are shown.")
         col,col0 = st.columns(2)
         with col:
-            # create an experimental interactive panda table with the data
-            st.dataframe(expenses_larger_than_average.style.highlight_max(axis=0),use_container_width=True)
+            # a bounded table, paged with tabs so turning a page does not rerun the app
+            table = to_units(outliers, self.amount_columns() + [TYPICAL_COLUMN]).round({SCORE_COLUMN: 1})
+            starts = range(0, len(table), OUTLIER_PAGE)
+            if len(starts) > 1:
+                for tab, start in zip(st.tabs([f"{start + 1}-{min(start + OUTLIER_PAGE, len(table))}" for start in starts]), starts):
+                    with tab:
+                        st.dataframe(table.iloc[start:start + OUTLIER_PAGE], use_container_width=True)
+            else:
+                st.dataframe(table, use_container_width=True)
         with col0:
             if self.gpt_api_key:
-                # Call OpenAI API
-                with st.spinner("Calling OpenAI's API..."):
-                    response = self.ask_gpt(self.gpt_api_key, f'''
-                    You are a bank statement financial analist.
-                    What can you tell me about this list of expenses larger than my average monthly spending?
-                    write a list of 5 recomendations based of the data.
-                    the currency is: {self.currency}
-                    the current month is: {current_month}
-                    Be specific, and include the numbers from the data.
-                    Data:
-                    ''', expenses_larger_than_average)
-                    st.info("🐱💬 Wally's ideas on expenses larger than average")
-                    st.info(response)
+                st.info("🐱💬 Wally's ideas on unusual expenses")
+                self.answer_panels["expenses"] = st.empty()
+                self.answer_panels["expenses"].info("Wally is thinking...")
+                self.context_reports["expenses"] = {}
+                self.answers.submit("expenses", self.stream_gpt, self.gpt_api_key, f'''
+                You are a bank statement financial analist.
+                What can you tell me about this list of my most unusual expenses? Each one is much larger than my typical expense in its category,
+                which is listed next to it with a score of how many typical deviations above it the expense is.
+                write a list of 5 recomendations based of the data.
+                the currency is: {self.currency}
+                the current month is: {current_month}
+                Be specific, and include the numbers from the data.
+                Data:
+                ''', outliers.head(PROMPT_OUTLIERS), self.context_reports["expenses"],
+                lambda budget: outlier_context(outliers.head(PROMPT_OUTLIERS), self.analysis.columns, budget))
             else:
                 st.warning("You need to set your GPT API key in the config file to use this feature.")
         self.show_charts()
+        self.show_answers()
+
+    def show_answers(self): #View
+        """Stream the GPT answers into their panels as the tokens arrive."""
+        texts = {name: "" for name in self.answer_panels}
+        failed = set()
+        for name, token, error in self.answers.drain():
+            if error is not None:
+                failed.add(name)
+                self.answer_panels[name].error(f"Error: {error}")
+            else:
+                texts[name] += token
+                self.answer_panels[name].info(texts[name])
+        # Say what part of the statement each answer is based on
+        for name, panel in self.answer_panels.items():
+            if name not in failed:
+                with panel.container():
+                    st.info(texts[name])
+                    st.caption(describe_report(self.context_reports[name]))
+        for name, timing in self.answers.timings.items():
+            self.tracer.add(f"gpt {name}", timing["seconds"] or 0)
+            if timing["first_token"] is not None:
+                self.tracer.add(f"gpt {name} first token", timing["first_token"])
 
     def show_charts(self): #View
         """Show charts of the financial data."""
         st.subheader("Cumulative variation of earnings and expenses")
-        tab1, tab2,tab3, tab4 = st.tabs(["7 days","15 days", "30 days", "180 days"])
-
-        with tab1:
-            col9, col10 = st.columns(2)
-            with col9:
-                # show metric of the total expenses for the last 7 days with delta in relation to the previous 7 days
-                st.metric(label="Total Expenses Last 7 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_7_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()}", delta=f"{self.delta_expenses_7*100}%", delta_color="inverse")
-            with col10:
-                # show metric of the total earnings for the last 7 days with delta in relation to the previous 7 days
-                st.metric(label="Total Earnings Last 7 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_7_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()}", delta=f"{self.delta_earnings_7*100}%")
-
-            fig5 = go.Figure()
-            fig5.add_trace(go.Scatter(x=self.data_last_7_days["day"], y=self.data_last_7_days[self.debit_column], name="Last 7 days", mode='lines+markers'))
-            fig5.add_trace(go.Scatter(x=self.data_previous_7_days["day"], y=self.data_previous_7_days[self.debit_column], name="Previous 7 days", mode='lines+markers'))
-            fig5.add_trace(go.Scatter(x=self.data_last_7_days["day"], y=self.data_last_7_days[self.credit_column], name="Earnigns Last 7 days", mode='lines+markers'))
-            # add a line with the expenses for the previous 7 days
-            fig5.add_trace(go.Scatter(x=self.data_previous_7_days["day"], y=self.data_previous_7_days[self.credit_column], name="Earnings Previous 7 days", mode='lines+markers'))
-            fig5.update_layout(title="Total Expenses for the Last 7 days")
-            st.plotly_chart(fig5, use_container_width=True)
-        
-        with tab2:
-            col11, col12 = st.columns(2)
-            with col11:
-                # show metric of the total expenses for the last 15 days with delta in relation to the previous 15 days
-                st.metric(label="Total Expenses Last 15 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_15_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()}", delta=f"{self.delta_expenses_15*100}%", delta_color="inverse")
-            with col12:
-                # show metric of the total earnings for the last 15 days with delta in relation to the previous 15 days
-                st.metric(label="Total Earnings Last 15 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_15_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()}", delta=f"{self.delta_earnings_15*100}%")
-
-            fig6 = go.Figure()
-            fig6.add_trace(go.Scatter(x=self.data_last_15_days["day"], y=self.data_last_15_days[self.debit_column], name="Last 15 days", mode='lines+markers'))
-            fig6.add_trace(go.Scatter(x=self.data_previous_15_days["day"], y=self.data_previous_15_days[self.debit_column], name="Previous 15 days", mode='lines+markers'))
-            fig6.add_trace(go.Scatter(x=self.data_last_15_days["day"], y=self.data_last_15_days[self.credit_column], name="Earnigns Last 15 days", mode='lines+markers'))
-            # add a line with the expenses for the previous 15 days
-            fig6.add_trace(go.Scatter(x=self.data_previous_15_days["day"], y=self.data_previous_15_days[self.credit_column], name="Earnings Previous 15 days", mode='lines+markers'))
-            fig6.update_layout(title="Total Expenses for the Last 15 days")
-            st.plotly_chart(fig6, use_container_width=True)
-
-        with tab3:
-            col13, col14 = st.columns(2)
-
-            with col13:
-                # show metric of the total expenses for the last 30 days with delta in relation to the previous 30 days
-                st.metric(label="Total Expenses Last 30 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_30_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()}", delta=f"{self.delta_expenses_30*100}%", delta_color="inverse")
-            with col14:
-                # show metric of the total earnings for the last 30 days with delta in relation to the previous 30 days
-                st.metric(label="Total Earnings Last 30 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_30_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()}", delta=f"{self.delta_earnings_30*100}%")
-
-            fig8 = go.Figure()
-            fig8.add_trace(go.Scatter(x=self.data_last_30_days["day"], y=self.data_last_30_days[self.debit_column], name="Expenses Last 30 days", mode='lines+markers'))
-            fig8.add_trace(go.Scatter(x=self.data_previous_30_days["day"], y=self.data_previous_30_days[self.debit_column], name="Expenses Previous 30 days", mode='lines+markers'))
-            # add a line with the earnings for the last 30 days
-            fig8.add_trace(go.Scatter(x=self.data_last_30_days["day"], y=self.data_last_30_days[self.credit_column], name="Earnigns Last 30 days", mode='lines+markers'))
-            # add a line with the expenses for the previous 30 days
-            fig8.add_trace(go.Scatter(x=self.data_previous_30_days["day"], y=self.data_previous_30_days[self.credit_column], name="Earnings Previous 30 days", mode='lines+markers'))
-            fig8.update_layout(title="Expenses by day in the last 30 days")
-            st.plotly_chart(fig8, use_container_width=True)
-        
-        with tab4:
-            col15, col16 = st.columns(2)
-            with col15:
-                # show metric of the total expenses for the last 180 days with delta in relation to the previous 180 days
-                st.metric(label="Total Expenses Last 180 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_180_days) & (self.data[self.date_column] < self.today)][self.debit_column].sum()}", delta=f"{self.delta_expenses_180*100}%", delta_color="inverse")
-            with col16:
-                # show metric of the total earnings for the last 180 days with delta in relation to the previous 180 days
-                st.metric(label="Total Earnings Last 180 days", value=f"{self.currency}{self.data[(self.data[self.date_column] >= self.last_180_days) & (self.data[self.date_column] < self.today)][self.credit_column].sum()}", delta=f"{self.delta_earnings_180*100}%")
-
-            fig9 = go.Figure()
-            fig9.add_trace(go.Scatter(x=self.data_last_180_days["day"], y=self.data_last_180_days[self.debit_column], name="Last 180 days", mode='lines+markers'))
-            fig9.add_trace(go.Scatter(x=self.data_previous_180_days["day"], y=self.data_previous_180_days[self.debit_column], name="Previous 180 days", mode='lines+markers'))
-            # add a line with the earnings for the last 180 days
-            fig9.add_trace(go.Scatter(x=self.data_last_180_days["day"], y=self.data_last_180_days[self.credit_column], name="Earnigns Last 180 days", mode='lines+markers'))
-            # add a line with the expenses for the previous 180 days
-            fig9.add_trace(go.Scatter(x=self.data_previous_180_days["day"], y=self.data_previous_180_days[self.credit_column], name="Earnings Previous 180 days", mode='lines+markers'))
-            fig9.update_layout(title="Expenses by day in the last 180 days")
-            st.plotly_chart(fig9, use_container_width=True)
+        tabs = st.tabs([f"{days} days" for days in PERIODS])
+
+        for tab, days in zip(tabs, PERIODS):
+            period = self.periods[days]
+            with tab, self.tracer.stage(f"chart {days} days", rows=len(period["data"])):
+                col9, col10 = st.columns(2)
+                with col9:
+                    # show metric of the total expenses for the period with delta in relation to the previous period
+                    st.metric(label=f"Total Expenses Last {days} days", value=f"{self.currency}{period['expenses']:,.2f}", delta=f"{period['delta_expenses']*100}%", delta_color="inverse")
+                with col10:
+                    # show metric of the total earnings for the period with delta in relation to the previous period
+                    st.metric(label=f"Total Earnings Last {days} days", value=f"{self.currency}{period['earnings']:,.2f}", delta=f"{period['delta_earnings']*100}%")
+
+                fig5 = go.Figure()
+                fig5.add_trace(go.Scatter(x=period["data"]["day"], y=period["data"][self.debit_column], name=f"Expenses Last {days} days", mode='lines+markers'))
+                fig5.add_trace(go.Scatter(x=period["previous_data"]["day"], y=period["previous_data"][self.debit_column], name=f"Expenses Previous {days} days", mode='lines+markers'))
+                # add a line with the earnings for the period
+                fig5.add_trace(go.Scatter(x=period["data"]["day"], y=period["data"][self.credit_column], name=f"Earnings Last {days} days", mode='lines+markers'))
+                # add a line with the earnings for the previous period
+                fig5.add_trace(go.Scatter(x=period["previous_data"]["day"], y=period["previous_data"][self.credit_column], name=f"Earnings Previous {days} days", mode='lines+markers'))
+                fig5.update_layout(title=f"Expenses by day in the last {days} days")
+                st.plotly_chart(fig5, use_container_width=True)
 
         # Line chart of cumulative earnings and spending
         st.subheader("Cumulative Earnings and Spending")
-        fig1 = go.Figure()
-
-        # add a trace for earnings
-        fig1.add_trace(go.Bar(x=self.data[self.date_column], y=self.data[self.credit_column], name='Earnings', marker=dict(color='green')))
-        # add a trace for expenses
-        fig1.add_trace(go.Bar(x=self.data[self.date_column], y=self.data[self.debit_column], name='Expenses', marker=dict(color='red')))
-        # add a trace for the balance
-        fig1.add_trace(go.Line(x=self.data[self.date_column], y=self.data[self.balance_column], name='Balance', marker=dict(color='blue')))
+        # Large statements get bucketed bars and a downsampled WebGL balance line
+        with self.tracer.stage("chart cumulative earnings and spending", rows=len(self.data)):
+            fig1 = cumulative_figure(to_units(self.data, self.amount_columns()), self.date_column, self.debit_column, self.credit_column, self.balance_column, self.chart_mode)
+            st.plotly_chart(fig1, use_container_width=True)
 
-        # set the layout for the legend
-        fig1.update_layout(showlegend=True, legend=dict(title=dict(text='Legend'), orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1))
-        
-        st.plotly_chart(fig1, use_container_width=True)
+        # All aggregates below come from one grouped pass over the transactions
+        with self.tracer.stage("chart aggregates", rows=len(self.data)):
+            chart_data = self.analysis.chart_data()
 
         # Pie chart of expenses per category
         st.subheader("Expenses per Category")
-        expenses_by_category = self.data.groupby(self.category_column)[self.debit_column].sum().reset_index()
-        fig2 = px.pie(expenses_by_category, values=self.debit_column, names=self.category_column)
+        fig2 = px.pie(chart_data["expenses_by_category"], values=self.debit_column, names=self.category_column)
         st.plotly_chart(fig2, use_container_width=True)
 
         # Monthly earnings and expenses
         st.subheader("Monthly Earnings and Expenses")
         # Bar chart with expenses per category per month
-        expenses_by_category_month = self.data.groupby([self.data[self.date_column].dt.to_period('M'), self.category_column])[self.debit_column].sum().reset_index()
-        expenses_by_category_month[self.date_column] = expenses_by_category_month[self.date_column].astype(str)
-        fig3 = px.bar(expenses_by_category_month, x=self.date_column, y=self.debit_column, color=self.category_column)
+        fig3 = px.bar(chart_data["expenses_by_category_month"], x=self.date_column, y=self.debit_column, color=self.category_column)
         fig3.update_layout(title="Expenses per Category per Month",legend=dict(
             orientation="h",
             yanchor="top",
@@ -435,28 +575,16 @@ class FinancialApp:
         st.plotly_chart(fig3, use_container_width=True)
     
         # Bar chart with earnings per month
-        earnings_by_month = self.data.groupby(self.data[self.date_column].dt.to_period('M'))[self.credit_column].sum().reset_index()
-        earnings_by_month[self.date_column] = earnings_by_month[self.date_column].astype(str)
-        fig4 = px.bar(earnings_by_month, x=self.date_column, y=self.credit_column, title='Earnings per Month')
+        fig4 = px.bar(chart_data["earnings_by_month"], x=self.date_column, y=self.credit_column, title='Earnings per Month')
         st.plotly_chart(fig4, use_container_width=True)
 
-        # cumulative daily expenses
-        # get the unique months of the year from the data
-        months_of_year = self.data[self.date_column].dt.strftime('%B %Y').unique()
-        # create an empty figure
+        # cumulative daily expenses, one line per month of the year
+        cumulative_expenses = chart_data["cumulative_expenses_by_month"]
         fig4 = go.Figure()
-        # loop through each month of the year and add a line to the figure
-        for month_of_year in months_of_year:
-            # filter the data by the month of the year
-            expenses_by_month_of_year = self.data[self.data[self.date_column].dt.strftime('%B %Y') == month_of_year]
-            expenses_by_day = expenses_by_month_of_year.groupby(expenses_by_month_of_year[self.date_column].dt.to_period('D'))[self.debit_column].sum().reset_index()
-            expenses_by_day[self.date_column] = expenses_by_day[self.date_column].astype(str)
-            # use cumsum() to get the cumulative sum of the debit column
-            expenses_by_day[self.debit_column] = expenses_by_day[self.debit_column].cumsum()
-            # add a line to the figure with the month of the year as the legend
-            fig4.add_trace(go.Scatter(x=expenses_by_day[self.date_column], y=expenses_by_day[self.debit_column], name=month_of_year))
+        for month_of_year in cumulative_expenses.columns:
+            fig4.add_trace(go.Scatter(x=cumulative_expenses.index, y=cumulative_expenses[month_of_year], name=month_of_year))
         # add a title to the plot
-        fig4.update_layout(title="Cumulative Daily Expenses by Month of Year")
+        fig4.update_layout(title="Cumulative Daily Expenses by Month of Year", xaxis_title="Day of month")
         st.plotly_chart(fig4, use_container_width=True)
         
 
@@ -0,0 +1,207 @@
+"""Time each stage of ingestion and analysis on synthetic statements and keep a history of the results.
+
+    python benchmark.py --rows 1000 100000 1000000
+
+Every stage is timed on its own (best of --repeat runs) and its peak traced memory is measured in a
+separate run. Results are appended as JSON lines to --history; a stage more than --tolerance slower
+than the median of its last five recorded runs at the same size is reported as a regression, and the
+exit code is then 1.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+from amounts import parse_amounts, to_units
+from analysis import PERIODS, StatementAnalysis
+from chart_data import build_chart_data
+from dates import DateParser
+from ingest import detect_encoding, parse_statement
+from plotting import cumulative_figure
+from synthetic import COLUMNS, DATE_FORMAT, write_statement
+from windows import DailyLedger, WindowIndex
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "synthetic")
+AMOUNT_COLUMNS = [COLUMNS["debit"], COLUMNS["credit"], COLUMNS["balance"]]
+TEXT_COLUMNS = [COLUMNS["description"], COLUMNS["category"]]
+TODAY = pd.Timestamp("2024-06-30")  # fixed so results do not drift with the calendar
+
+
+def clean_number_stage(context):
+    """The per-cell FinancialApp.clean_number apply, as the reference for parse_amounts."""
+    for column in AMOUNT_COLUMNS:
+        context["raw"][column].apply(context["clean_number"])
+
+
+def parse_amounts_stage(context):
+    for column in AMOUNT_COLUMNS:
+        parse_amounts(context["raw"][column])
+
+
+def dates_stage(context):
+    pd.to_datetime(context["raw"][COLUMNS["date"]], format=DATE_FORMAT)
+
+
+def date_parser_stage(context):
+    """Infer the format and parse each distinct date once, as parse_statement does."""
+    DateParser().parse(context["raw"][COLUMNS["date"]])
+
+
+def encoding_stage(context):
+    detect_encoding(io.BytesIO(context["content"]))
+
+
+def ingest_stage(context):
+    parse_statement("benchmark.csv", context["content"], ";", COLUMNS["date"], DATE_FORMAT, AMOUNT_COLUMNS, ".", ",", TEXT_COLUMNS)
+
+
+def window_sums_stage(context):
+    windows = WindowIndex(context["data"], COLUMNS["date"], [COLUMNS["debit"], COLUMNS["credit"]])
+    for days in PERIODS:
+        windows.compare(COLUMNS["debit"], TODAY, days)
+        windows.compare(COLUMNS["credit"], TODAY, days)
+
+
+def daily_ledger_stage(context):
+    daily = DailyLedger(context["data"], COLUMNS["date"], COLUMNS["debit"], COLUMNS["credit"], COLUMNS["balance"])
+    for days in PERIODS:
+        daily.period(TODAY, days)
+
+
+def chart_data_stage(context):
+    build_chart_data(context["data"], COLUMNS["date"], COLUMNS["debit"], COLUMNS["credit"], COLUMNS["category"])
+
+
+def summary_stage(context):
+    StatementAnalysis(context["data"], COLUMNS, TODAY, 1000).summary()
+
+
+def figure_stage(context):
+    cumulative_figure(to_units(context["data"], AMOUNT_COLUMNS), COLUMNS["date"], COLUMNS["debit"], COLUMNS["credit"], COLUMNS["balance"]).to_json()
+
+
+STAGES = {
+    "encoding": encoding_stage,
+    "ingest": ingest_stage,
+    "clean_number": clean_number_stage,
+    "parse_amounts": parse_amounts_stage,
+    "dates": dates_stage,
+    "date_parser": date_parser_stage,
+    "window_sums": window_sums_stage,
+    "daily_ledger": daily_ledger_stage,
+    "chart_data": chart_data_stage,
+    "summary": summary_stage,
+    "figure": figure_stage,
+}
+
+
+def statement_path(rows, seed):
+    """Return the synthetic statement for `rows` and `seed`, generating it on first use."""
+    path = os.path.join(DATA_DIR, f"statement-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        write_statement(path + ".tmp", rows, seed, end=TODAY)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def measure(stage, context, repeat):
+    """Return the best wall time of `repeat` runs and the peak traced memory of one more run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage(context)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    stage(context)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run(rows, stages, repeat=3, seed=0):
+    """Benchmark `stages` on a statement of `rows` transactions. Returns one result dict per stage."""
+    with open(statement_path(rows, seed), "rb") as file:
+        content = file.read()
+    context = {
+        "content": content,
+        "raw": pd.read_csv(io.BytesIO(content), delimiter=";", encoding="cp1252", dtype=str),
+        "data": parse_statement("benchmark.csv", content, ";", COLUMNS["date"], DATE_FORMAT, AMOUNT_COLUMNS, ".", ",", TEXT_COLUMNS)["data"],
+    }
+    if "clean_number" in stages:
+        # imported here, outside the timings, because app.py pulls in Streamlit
+        from app import FinancialApp
+        context["clean_number"] = FinancialApp().clean_number
+    results = []
+    for name in stages:
+        seconds, peak = measure(STAGES[name], context, repeat)
+        results.append({"rows": rows, "stage": name, "seconds": seconds, "peak_bytes": peak})
+    return results
+
+
+def environment():
+    """Describe where the benchmark ran, so history entries can be compared fairly."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "pandas": pd.__version__, "machine": platform.node()}
+
+
+def read_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def find_regressions(results, history, tolerance):
+    """Return the results slower than the median of the last five runs of the same stage and size by more than `tolerance`."""
+    regressions = []
+    for result in results:
+        previous = [entry["seconds"] for entry in history if entry["stage"] == result["stage"] and entry["rows"] == result["rows"]][-5:]
+        if previous and result["seconds"] > statistics.median(previous) * (1 + tolerance):
+            regressions.append(dict(result, baseline=statistics.median(previous)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default="benchmark_history.jsonl")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args(argv)
+    warnings.simplefilter("ignore")
+
+    history = read_history(args.history)
+    stamp = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), **environment()}
+    regressions = []
+    for rows in args.rows:
+        results = run(rows, args.stages, args.repeat, args.seed)
+        for result in results:
+            print(f"{rows:>10,} rows  {result['stage']:<14} {result['seconds']:9.4f} s  {result['peak_bytes'] / 2**20:9.1f} MiB")
+        regressions += find_regressions(results, history, args.tolerance)
+        with open(args.history, "a", encoding="utf-8") as file:
+            for result in results:
+                file.write(json.dumps({**stamp, **result}) + "\n")
+    for regression in regressions:
+        print(f"REGRESSION {regression['stage']} at {regression['rows']:,} rows: {regression['seconds']:.4f} s "
+              f"vs median {regression['baseline']:.4f} s", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
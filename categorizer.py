@@ -0,0 +1,179 @@
+import re
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+UNCATEGORIZED = "Uncategorized"
+# category -> keywords, matched as whole words in the normalized merchant name; the longest match wins
+DEFAULT_RULES = {
+    "Groceries": ["PINGO DOCE", "CONTINENTE", "LIDL", "ALDI", "MINIPRECO", "MERCADONA", "AUCHAN", "INTERMARCHE", "SUPERMERCADO", "TESCO", "CARREFOUR"],
+    "Restaurants": ["RESTAURANTE", "RESTAURANT", "CAFE", "PASTELARIA", "MCDONALDS", "BURGER KING", "UBER EATS", "GLOVO", "PIZZA", "STARBUCKS"],
+    "Transport": ["UBER", "BOLT", "GALP", "REPSOL", "CEPSA", "CP COMBOIOS", "METRO", "VIA VERDE", "PORTAGEM", "TAXI", "PARKING", "RYANAIR", "TAP"],
+    "Shopping": ["AMAZON", "FNAC", "ZARA", "IKEA", "WORTEN", "PRIMARK", "DECATHLON", "ALIEXPRESS", "H M"],
+    "Leisure": ["NETFLIX", "SPOTIFY", "CINEMA", "STEAM", "HBO", "DISNEY", "PLAYSTATION", "GINASIO", "GYM"],
+    "Utilities": ["EDP", "EPAL", "MEO", "VODAFONE", "NOS COMUNICACOES", "ENDESA", "GALP ENERGIA", "AGUAS"],
+    "Health": ["FARMACIA", "PHARMACY", "HOSPITAL", "CLINICA", "WELLS", "CUF", "DENTISTA"],
+    "Salary": ["SALARIO", "SALARY", "ORDENADO", "VENCIMENTO", "PAYROLL"],
+    "Transfers": ["TRF", "TRANSF", "TRANSFERENCIA", "TRANSFER", "MBWAY", "MB WAY"],
+}
+# words that say how a card was used rather than where
+NOISE_WORDS = ["COMPRA", "PAGAMENTO", "PAG", "POS", "CARD", "CARTAO", "PURCHASE", "TPA", "DEB", "DD"]
+GPT_BATCH = 50  # merchants per categorization request
+CATEGORY_PROMPT = ("You categorize bank transactions. For each merchant below answer with one line 'merchant => category', "
+                   "using only these categories: {categories}. Use 'Other' when none fits.")
+
+
+def normalize_merchants(descriptions): #Model
+    """Reduce transaction descriptions to merchant names: upper case, no accents, punctuation, references or card noise.
+
+    'Pingo Doce 1234 Lisboa' and 'PINGO DOCE 5678 LISBOA' both become 'PINGO DOCE LISBOA'.
+    """
+    text = pd.Series(descriptions, dtype=object).fillna("").astype(str).str.upper()
+    text = text.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    text = text.str.replace(r"[^A-Z0-9]+", " ", regex=True)
+    # references, card numbers and dates all contain digits
+    text = text.str.replace(r"\b[A-Z]*\d[A-Z0-9]*\b", " ", regex=True)
+    text = text.str.replace(r"\b(?:" + "|".join(NOISE_WORDS) + r")\b", " ", regex=True)
+    return text.str.split().str.join(" ")
+
+
+class KeywordMatcher: #Model
+    """Aho-Corasick automaton that finds every keyword in a text in one pass over its characters."""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for keyword in keywords:
+            state = 0
+            for character in keyword:
+                if character not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][character] = len(self.goto) - 1
+                state = self.goto[state][character]
+            self.output[state].append(keyword)
+        # breadth first, so the fail link of every shorter prefix is known first; the root's children fail to the root
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and character not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(character, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Return every keyword occurring in `text`, overlapping ones included."""
+        found = []
+        state = 0
+        for character in text:
+            while state and character not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(character, 0)
+            found.extend(self.output[state])
+        return found
+
+
+class Categorizer: #Model
+    """Fill in categories from transaction descriptions with keyword rules.
+
+    Each distinct description is normalized once and each distinct merchant name is matched once; the
+    answers are kept in `memo`, which also takes the categories learned elsewhere (e.g. from GPT).
+    """
+
+    def __init__(self, rules=None):
+        self.rules = DEFAULT_RULES if rules is None else rules
+        # padded with spaces so keywords only match whole words
+        self.keywords = {}
+        for category, keywords in self.rules.items():
+            for keyword in normalize_merchants(keywords):
+                if keyword:
+                    self.keywords.setdefault(f" {keyword} ", category)
+        self.matcher = KeywordMatcher(self.keywords)
+        self.memo = {}
+
+    def categories(self):
+        return list(self.rules)
+
+    def classify(self, merchant):
+        """Return the category of a normalized merchant name, or None."""
+        if merchant not in self.memo:
+            found = self.matcher.find(f" {merchant} ")
+            self.memo[merchant] = self.keywords[max(found, key=len)] if found else None
+        return self.memo[merchant]
+
+    def learn(self, categories):
+        """Remember categories for merchant names, e.g. the ones GPT suggested."""
+        self.memo.update(categories)
+
+    def categorize(self, descriptions, existing=None):
+        """Return a category per description and a coverage report.
+
+        Rows with a category in `existing` keep it; the others get the matched category or UNCATEGORIZED.
+        The report has the rows and distinct merchants matched, the seconds spent, and `unmatched`, the
+        merchants without a category with their number of rows, most frequent first.
+        """
+        start = time.perf_counter()
+        codes, distinct = pd.factorize(descriptions)
+        merchant_codes, merchants = pd.factorize(normalize_merchants(distinct))
+        matched = np.array([self.classify(merchant) for merchant in merchants], dtype=object)
+        by_row = matched[merchant_codes][codes] if len(merchants) else np.full(len(codes), None, dtype=object)
+        by_row[codes < 0] = None
+        categories = pd.Series(by_row, index=descriptions.index, dtype=object)
+        if existing is not None:
+            categories = existing.astype(object).where(existing.notna() & (existing.astype(str).str.strip() != ""), categories)
+        unmatched = categories.isna()
+        # the merchant name of every row without a category
+        names = np.asarray(merchants, dtype=object)[merchant_codes] if len(merchants) else np.array([], dtype=object)
+        missing = pd.Series(names[codes[unmatched.to_numpy() & (codes >= 0)]], dtype=object)
+        report = {
+            "rows": len(categories),
+            "matched_rows": int((~unmatched).sum()),
+            "coverage": float((~unmatched).mean()) if len(categories) else 1.0,
+            "merchants": len(merchants),
+            "matched_merchants": int(pd.notna(matched).sum()),
+            "unmatched": missing[missing != ""].value_counts(),
+            "seconds": time.perf_counter() - start,
+        }
+        return categories.fillna(UNCATEGORIZED).astype("category"), report
+
+
+def parse_rules(text): #Model
+    """Read rules written one category per line as 'Category: keyword, keyword'."""
+    rules = {}
+    for line in text.splitlines():
+        if ":" in line:
+            category, keywords = line.split(":", 1)
+            keywords = [keyword.strip() for keyword in keywords.split(",") if keyword.strip()]
+            if category.strip() and keywords:
+                rules.setdefault(category.strip(), []).extend(keywords)
+    return rules
+
+
+def format_rules(rules): #View
+    """Write rules in the format parse_rules reads."""
+    return "\n".join(f"{category}: {', '.join(keywords)}" for category, keywords in rules.items())
+
+
+def category_prompt(merchants, categories): #Model
+    """Build the GPT prompt asking for the category of each merchant name."""
+    return CATEGORY_PROMPT.format(categories=", ".join(categories + ["Other"])) + "\n" + "\n".join(merchants)
+
+
+def parse_category_answer(answer, merchants, categories): #Model
+    """Read 'merchant => category' lines, keeping only the merchants asked about and the categories offered."""
+    asked = set(merchants)
+    allowed = {category.lower(): category for category in categories}
+    learned = {}
+    for line in answer.splitlines():
+        merchant, separator, category = line.partition("=>")
+        merchant = re.sub(r"^[\s\-*\d.]+", "", merchant).strip()
+        if separator and merchant in asked:
+            learned[merchant] = allowed.get(category.strip().strip(".").lower())
+    return learned
@@ -0,0 +1,72 @@
+import pandas as pd
+
+
+def chart_totals(data, date_column, debit_column, credit_column, category_column): #Model
+    """Group the transactions by integer (month, day, category) keys, with month as year * 12 + month - 1.
+
+    Totals of separate sets of transactions can be added together with add_chart_totals.
+    """
+    # rows without a date, like a "Total" footer, have no month or day to go under
+    data = data[data[date_column].notna()]
+    dates = data[date_column]
+    month = (dates.dt.year * 12 + dates.dt.month - 1).astype("int64").rename("month")
+    day = dates.dt.day.astype("int64").rename("day")
+    return data.groupby([month, day, data[category_column]], sort=True, observed=True)[[debit_column, credit_column]].sum()
+
+
+def add_chart_totals(totals, other): #Model
+    """Add two tables returned by chart_totals."""
+    return pd.concat([totals, other]).groupby(level=[0, 1, 2], sort=True, observed=True).sum()
+
+
+def build_chart_data(data, date_column, debit_column, credit_column, category_column, totals=None): #Model
+    """Build every aggregate show_charts plots from a single grouped pass over the transactions.
+
+    The transactions are grouped once by integer (month, day, category) keys; everything else is derived
+    from that small table, which may be passed as `totals` instead of `data`. Returns a dict of
+    ready-to-plot frames:
+
+    - expenses_by_category: total debit per category
+    - expenses_by_category_month: debit per month ('YYYY-MM' in `date_column`) and category
+    - earnings_by_month: credit per month ('YYYY-MM' in `date_column`)
+    - cumulative_expenses_by_month: running debit by day of month (index 1-31), one column per month
+      named like 'January 2024', empty outside the days with transactions
+    """
+    if totals is None:
+        totals = chart_totals(data, date_column, debit_column, credit_column, category_column)
+
+    by_month_category = totals.groupby(level=["month", category_column], sort=True, observed=True).sum()
+    by_month = by_month_category.groupby(level="month").sum()
+    by_month_day = totals.groupby(level=["month", "day"], sort=True)[debit_column].sum()
+
+    months = by_month.index.to_numpy()
+    keys = {key: f"{key // 12}-{key % 12 + 1:02d}" for key in months}
+    names = {key: pd.Timestamp(year=key // 12, month=key % 12 + 1, day=1).strftime("%B %Y") for key in months}
+
+    expenses_by_category = by_month_category.groupby(level=category_column, observed=True)[debit_column].sum().reset_index()
+
+    expenses_by_category_month = by_month_category[debit_column].reset_index()
+    expenses_by_category_month[date_column] = expenses_by_category_month.pop("month").map(keys)
+    expenses_by_category_month = expenses_by_category_month[[date_column, category_column, debit_column]]
+
+    earnings_by_month = by_month[credit_column].reset_index()
+    earnings_by_month[date_column] = earnings_by_month.pop("month").map(keys)
+    earnings_by_month = earnings_by_month[[date_column, credit_column]]
+
+    # one column per month, one row per day of month, accumulated down the rows
+    daily = by_month_day.unstack("month").reindex(range(1, 32))
+    cumulative = daily.fillna(0).cumsum()
+    observed_days = by_month_day.reset_index("day")["day"].groupby(level="month")
+    first_day = observed_days.min().reindex(cumulative.columns).to_numpy()
+    last_day = observed_days.max().reindex(cumulative.columns).to_numpy()
+    days = cumulative.index.to_numpy()[:, None]
+    cumulative = cumulative.where((days >= first_day[None, :]) & (days <= last_day[None, :]))
+    cumulative.columns = [names[key] for key in cumulative.columns]
+    cumulative.index.name = "day"
+
+    return {
+        "expenses_by_category": expenses_by_category,
+        "expenses_by_category_month": expenses_by_category_month,
+        "earnings_by_month": earnings_by_month,
+        "cumulative_expenses_by_month": cumulative,
+    }
@@ -0,0 +1,108 @@
+"""Analyze a directory of bank statements without the Streamlit app.
+
+Every CSV file is read, cleaned and summarized in its own worker process, and the same metrics the
+dashboard shows are written either as one JSON report per statement or as one Parquet table with a
+row per statement:
+
+    python cli.py statements/ reports/ --date-column Date --debit-column Debit --credit-column Credit \\
+        --balance-column Balance --category-column Category --description-column Description
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from amounts import NUMBER_FORMATS
+from analysis import StatementAnalysis
+from categorizer import Categorizer
+from ingest import parse_statement
+
+
+def analyze_statement(path, options): #Model
+    """Read, clean and summarize one statement file. Returns its summary, or the error if it failed."""
+    start = time.perf_counter()
+    name = os.path.basename(path)
+    try:
+        with open(path, "rb") as file:
+            content = file.read()
+        columns = options["columns"]
+        amount_columns = list(dict.fromkeys([columns["debit"], columns["credit"], columns["balance"]]))
+        thousands, decimal = NUMBER_FORMATS[options["number_format"]]
+        text_columns = [column for column in (columns["description"], columns["category"]) if column is not None]
+        parsed = parse_statement(name, content, options["delimiter"], columns["date"], options["date_format"], amount_columns, thousands, decimal,
+                                 text_columns)
+        data = parsed["data"]
+        coverage = None
+        if columns["category"] is None:
+            # no category column: fill one in from the descriptions with the default rules
+            columns = dict(columns, category="Category")
+            categories, report = Categorizer().categorize(data[columns["description"]])
+            data = data.assign(Category=categories)
+            coverage = report["coverage"]
+        summary = StatementAnalysis(data, columns, options["today"], options["savings"]).summary()
+        if coverage is not None:
+            summary.update(category_coverage=coverage)
+        summary.update(parse_failures=parsed["parse_failures"], encoding=parsed["encoding"], date_format=parsed["date_format"], bytes_per_row=parsed["bytes_per_row"])
+    except Exception as error:
+        summary = {"error": f"{type(error).__name__}: {error}"}
+    summary.update(statement=name, seconds=time.perf_counter() - start)
+    return summary
+
+
+def run(paths, output, options, report_format="json", workers=None): #Controller
+    """Analyze `paths` on `workers` processes and write the reports to `output`. Returns the number of failed statements."""
+    os.makedirs(output, exist_ok=True)
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(analyze_statement, path, options) for path in paths]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            if report_format == "json":
+                report = os.path.join(output, os.path.splitext(summary["statement"])[0] + ".json")
+                with open(report, "w", encoding="utf-8") as file:
+                    json.dump(summary, file, indent=2, ensure_ascii=False)
+            status = summary["error"] if "error" in summary else f"{summary['rows']} rows"
+            print(f"{summary['statement']}: {status} ({summary['seconds']:.2f} s)", file=sys.stderr)
+    if report_format == "parquet":
+        # one row per statement, nested metrics flattened to columns like periods.30.expenses
+        table = pd.json_normalize(sorted(summaries, key=lambda summary: summary["statement"]))
+        table.to_parquet(os.path.join(output, "summary.parquet"), index=False)
+    return sum("error" in summary for summary in summaries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("statements", help="directory with the CSV statements")
+    parser.add_argument("output", help="directory for the reports")
+    parser.add_argument("--format", choices=("json", "parquet"), default="json", help="one JSON report per statement, or one Parquet table")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--delimiter", default=";")
+    parser.add_argument("--date-format", default="auto", help="strptime format of the dates, or 'auto' to detect it")
+    parser.add_argument("--number-format", choices=list(NUMBER_FORMATS), default="1.234,56")
+    parser.add_argument("--savings", type=float, default=1000, help="money to save every month")
+    parser.add_argument("--today", default=None, help="date the comparison periods end on (default: today)")
+    for role in ("date", "debit", "credit", "balance", "description"):
+        parser.add_argument(f"--{role}-column", required=True)
+    parser.add_argument("--category-column", default=None, help="column with the categories (default: categorize from the descriptions)")
+    args = parser.parse_args(argv)
+
+    paths = sorted(os.path.join(args.statements, name) for name in os.listdir(args.statements) if name.lower().endswith(".csv"))
+    options = {
+        "columns": {role: getattr(args, f"{role}_column") for role in ("date", "debit", "credit", "balance", "category", "description")},
+        "delimiter": args.delimiter,
+        "date_format": args.date_format,
+        "number_format": args.number_format,
+        "savings": args.savings,
+        "today": args.today,
+    }
+    failed = run(paths, args.output, options, args.format, args.workers)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
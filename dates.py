@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+AUTO = "auto"
+# Tried in this order when the format is inferred, so day-first wins over month-first when both fit
+DATE_FORMATS = (
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d", "%Y%m%d",
+    "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%d-%m-%y", "%d/%m/%y", "%d.%m.%y",
+    "%d-%m-%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d/%m/%Y %H:%M",
+    "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d %B %Y",
+    "%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y",
+)
+SAMPLE_DATES = 200  # distinct values used to infer the format
+
+
+def infer_date_formats(values, sample=SAMPLE_DATES): #Model
+    """Return the DATE_FORMATS that parse every one of the first `sample` distinct non-empty `values`, in order of preference."""
+    strings = pd.Series(values).dropna().astype(str).str.strip().drop_duplicates()
+    strings = strings[strings != ""].head(sample)
+    if strings.empty:
+        return list(DATE_FORMATS[:1])
+    return [date_format for date_format in DATE_FORMATS if pd.to_datetime(strings, format=date_format, errors="coerce").notna().all()]
+
+
+def parse_distinct(strings, date_format): #Model
+    """Parse a Series of date strings with exactly `date_format`, giving NaT for those that do not match.
+
+    An exact format keeps pandas on its compiled parser, which has its own fast path for ISO and other
+    zero-padded numeric layouts; slicing the digits out in Python measured several times slower.
+    """
+    return pd.Series(pd.to_datetime(strings, format=date_format, errors="coerce"), index=strings.index)
+
+
+class DateParser: #Model
+    """Parse the date column of a statement with one format, each distinct string only once.
+
+    With `date_format` "auto" the format is inferred from the first values seen, and the other formats
+    that fit them are kept as fallbacks: when later values do not match, the next fallback that reads
+    every value seen so far takes over and the stored days are parsed again with it; `switched` then
+    tells that values returned before are stale. Parsed strings are remembered, so the chunks of a
+    statement, which repeat the same days, only parse the days they add. Raises ValueError when a date
+    matches no format.
+    """
+
+    def __init__(self, date_format=AUTO):
+        self.format = None if date_format == AUTO else date_format
+        self.candidates = None if date_format == AUTO else [date_format]
+        self.known = pd.Series(dtype="datetime64[ns]")
+        self.switched = False
+
+    def parse(self, values):
+        """Return `values` as datetime64, with empty cells as NaT."""
+        codes, uniques = pd.factorize(values)
+        if not len(uniques):
+            return pd.Series(np.full(len(values), np.datetime64("NaT", "ns")), index=values.index, name=values.name)
+        strings = pd.Series(uniques, dtype=object).astype(str).str.strip()
+        new = strings[(strings != "") & ~strings.isin(self.known.index)].drop_duplicates()
+        if len(new):
+            # parsed first, since a change of format parses the known strings again
+            parsed = pd.Series(self._parse_new(new).to_numpy(dtype="datetime64[ns]"), index=new.to_numpy())
+            self.known = pd.concat([self.known, parsed])
+        days = self.known.reindex(strings).to_numpy(dtype="datetime64[ns]")
+        # codes are -1 for missing cells
+        parsed = np.where(codes >= 0, days[codes], np.datetime64("NaT", "ns"))
+        return pd.Series(parsed, index=values.index, name=values.name)
+
+    def _parse_new(self, strings):
+        if self.candidates is None:
+            self.candidates = infer_date_formats(strings)
+        if self.format is not None:
+            parsed = parse_distinct(strings, self.format)
+            if parsed.notna().all():
+                return parsed
+            failed = strings[parsed.isna()]
+        # the format so far does not fit: the next candidate that reads both the stored and the new strings takes over
+        seen = pd.Series(self.known.index, dtype=object)
+        while self.candidates:
+            date_format = self.candidates[0]
+            if date_format != self.format:
+                parsed = parse_distinct(pd.concat([seen, strings], ignore_index=True), date_format)
+                if parsed.notna().all():
+                    self.switched = self.switched or len(seen) > 0
+                    self.format = date_format
+                    self.known = pd.Series(parsed.iloc[:len(seen)].to_numpy(dtype="datetime64[ns]"), index=self.known.index)
+                    return pd.Series(parsed.iloc[len(seen):].to_numpy(), index=strings.index)
+            self.candidates = self.candidates[1:]
+        if self.format is None:
+            raise ValueError(f"Could not recognize the date format of values like {_examples(strings)}; set the date format in the settings.")
+        raise ValueError(f"Dates like {_examples(failed)} do not match the date format {self.format!r}.")
+
+
+def _examples(strings):
+    return ", ".join(repr(value) for value in strings.head(3))
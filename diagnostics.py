@@ -0,0 +1,83 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "traces")
+
+logger = logging.getLogger("wally.diagnostics")
+
+
+def current_memory():
+    """Return the resident memory of this process in bytes, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Tracer: #Model
+    """Records the wall time, row count and memory change of each named stage of a run.
+
+    Every finished stage is also logged as a JSON line on the `wally.diagnostics` logger and appended
+    to a trace file under `directory`, one file per day.
+    """
+
+    def __init__(self, directory=TRACE_DIR):
+        self.directory = directory
+        self.run_id = uuid.uuid4().hex[:8]
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time the body of the with-block; the yielded dict may be updated, e.g. with the rows produced."""
+        record = {"stage": name, "rows": rows}
+        memory = current_memory()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            after = current_memory()
+            self.add(record["stage"], seconds, record["rows"], None if memory is None or after is None else after - memory)
+
+    def add(self, name, seconds, rows=None, memory_delta=None):
+        """Record a stage that was measured elsewhere, e.g. on a worker thread."""
+        record = {"run": self.run_id, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "stage": name,
+                  "seconds": round(seconds, 6), "rows": rows, "memory_delta": memory_delta}
+        self.records.append(record)
+        line = json.dumps(record)
+        logger.info(line)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"trace-{time.strftime('%Y-%m-%d')}.jsonl"), "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+        except OSError:
+            logger.warning("Could not write the trace file in %s", self.directory)
+
+
+@contextmanager
+def profiled(enabled, directory=TRACE_DIR):
+    """Run the with-block under cProfile when `enabled`, yielding a dict that gets the dump path and a text report."""
+    result = {}
+    if not enabled:
+        yield result
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        result["path"] = os.path.join(directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        profiler.dump_stats(result["path"])
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(30)
+        result["report"] = report.getvalue()
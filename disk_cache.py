@@ -0,0 +1,36 @@
+import os
+import threading
+
+
+def evict_oldest(directory, suffix, max_bytes): #Model
+    """Delete the least recently modified `suffix` files in `directory` until they fit in `max_bytes`.
+
+    Several threads may store and evict at once, so files another thread removed in the meantime are skipped.
+    """
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(suffix):
+            try:
+                stat = os.stat(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        remove_file(os.path.join(directory, name))
+        total -= size
+
+
+def remove_file(path): #Model
+    """Delete a file, unless another thread already did."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def temporary_path(path): #Model
+    """Return a name to write `path` under before moving it in place, unique to this process and thread."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
@@ -0,0 +1,80 @@
+"""Local stand-in for the OpenAI chat completions endpoint, for trying out GPT latency without network access.
+
+Run it and point the app at it:
+
+    python fake_openai.py --port 8001 --latency 2 --token-delay 0.05
+    OPENAI_API_BASE=http://localhost:8001/v1 streamlit run app.py
+
+Any API key is accepted. Every request waits `latency` seconds, then answers with a canned
+text one word at a time (as server-sent events when `stream` is set).
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = ("Meow. Your spending looks steady this month. Here are some ideas: "
+          "1. Cook at home more often. 2. Review your subscriptions. 3. Set up an automatic transfer to savings. "
+          "4. Compare your utility providers. 5. Keep a small emergency fund.")
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    latency = 1.0
+    token_delay = 0.02
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        tokens = [word + " " for word in ANSWER.split(" ")]
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in tokens:
+                self.send_event({"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+                time.sleep(self.token_delay)
+            self.send_event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            self.wfile.write(b"data: [DONE]\n\n")
+        else:
+            time.sleep(self.token_delay * len(tokens))
+            body = json.dumps({
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def send_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8001, latency=1.0, token_delay=0.02, background=False):
+    """Start the fake server; with `background` it runs on a daemon thread and the server is returned."""
+    handler = type("Handler", (FakeCompletionHandler,), {"latency": latency, "token_delay": token_delay})
+    server = ThreadingHTTPServer(("localhost", port), handler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"Fake OpenAI API on http://localhost:{port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.token_delay)
@@ -0,0 +1,224 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chardet
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from amounts import parse_amounts, to_cents
+from dates import DateParser
+
+ENCODING_SAMPLE_BYTES = 64 * 1024  # bytes read from each end of the file to guess the encoding
+CHUNK_ROWS = 50000  # rows parsed and cleaned at a time
+RAW_SAMPLE_ROWS = 10000  # rows read as plain text to report the memory a raw read would take
+LEDGER_LAYOUT = 2  # changes whenever parse_statement returns the ledger in another shape or order
+
+
+def detect_encoding(file, sample_bytes=ENCODING_SAMPLE_BYTES): #Model
+    """Detect the encoding of a file from its first and last `sample_bytes` instead of the whole upload.
+
+    The samples are cut at line breaks, so they never split a multi-byte character, and the guess must
+    decode both of them; otherwise the whole file is looked at. Pass `sample_bytes=None` to look at the
+    whole file right away.
+    """
+    file.seek(0)
+    size = file.seek(0, 2)
+    file.seek(0)
+    if sample_bytes is None or size <= 2 * sample_bytes:
+        return _guess_encoding([file.read()], file)
+    head = file.read(sample_bytes)
+    head = head[:head.rfind(b"\n") + 1] or head
+    # look at the tail too, accented descriptions are often further down than the header
+    file.seek(size - sample_bytes)
+    tail = file.read()
+    tail = tail[tail.find(b"\n") + 1:] if b"\n" in tail else tail
+    encoding = _guess_encoding([head, tail], file)
+    try:
+        for sample in (head, tail):
+            sample.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return detect_encoding(file, sample_bytes=None)
+    return encoding
+
+
+def _guess_encoding(samples, file):
+    detector = chardet.UniversalDetector()
+    for sample in samples:
+        detector.feed(sample)
+    detector.close()
+    file.seek(0)
+    encoding = detector.result["encoding"] or "utf-8"
+    # a plain ASCII sample says nothing about the rest of the file, so assume its superset
+    return "utf-8" if encoding == "ascii" else encoding
+
+
+def read_header(file, delimiter, encoding): #Model
+    """Read only the column names of a CSV file."""
+    file.seek(0)
+    columns = list(pd.read_csv(file, delimiter=delimiter, encoding=encoding, nrows=0).columns)
+    file.seek(0)
+    return columns
+
+
+def read_statement(file, delimiter, encoding, clean=None, dtype=None, chunk_rows=CHUNK_ROWS, usecols=None, restart=None): #Model
+    """Read a CSV file in chunks of `chunk_rows`, passing each chunk through `clean` before combining them.
+
+    Only one raw chunk is held in memory at a time, and only the `usecols` columns if given. If the
+    sampled encoding turns out to be wrong further down the file, the encoding is detected again from
+    the whole file and the read restarts, after calling `restart` to reset whatever `clean` counted.
+    Returns the data and the encoding it was read with.
+    """
+    try:
+        return _read_chunks(file, delimiter, encoding, clean, dtype, chunk_rows, usecols), encoding
+    except UnicodeDecodeError:
+        encoding = detect_encoding(file, sample_bytes=None)
+        if restart is not None:
+            restart()
+        return _read_chunks(file, delimiter, encoding, clean, dtype, chunk_rows, usecols), encoding
+
+
+def _read_chunks(file, delimiter, encoding, clean, dtype, chunk_rows, usecols):
+    file.seek(0)
+    chunks = []
+    with pd.read_csv(file, delimiter=delimiter, encoding=encoding, dtype=dtype, chunksize=chunk_rows, usecols=usecols) as reader:
+        for chunk in reader:
+            chunks.append(clean(chunk) if clean is not None else chunk)
+    file.seek(0)
+    if not chunks:
+        return pd.DataFrame(columns=usecols or read_header(file, delimiter, encoding))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def clean_chunk(chunk, date_column, dates, amount_columns, thousands, decimal, failures): #Model
+    """Parse the dates (with the DateParser `dates`) and amounts (as integer cents) of one chunk of a statement,
+    adding the amounts that failed to parse to `failures`."""
+    chunk[date_column] = dates.parse(chunk[date_column])
+    for column in amount_columns:
+        amounts, failed = parse_amounts(chunk[column], thousands, decimal)
+        chunk[column] = to_cents(amounts)
+        failures[column] = failures.get(column, 0) + failed
+    return chunk
+
+
+def parse_statement(name, content, delimiter, date_column, date_format, amount_columns, thousands, decimal, text_columns=()): #Model
+    """Detect the encoding of, read and clean one statement given as bytes into a compact ledger.
+
+    Only the date, amount and `text_columns` are kept: dates as datetime64, amounts as Int64 cents and
+    the text columns dictionary-encoded as categories, with the transactions oldest first. `date_format` may be "auto" to infer it; the
+    format used is returned. Takes and returns only plain, picklable values so it can run in a worker process.
+    """
+    start = time.perf_counter()
+    file = io.BytesIO(content)
+    encoding = detect_encoding(file)
+    failures = {}
+    dates = DateParser(date_format)
+    text_columns = [column for column in dict.fromkeys(text_columns) if column is not None and column != date_column and column not in amount_columns]
+    def read(encoding):
+        return read_statement(file, delimiter, encoding, dtype={column: str for column in [date_column, *amount_columns]},
+                              clean=lambda chunk: clean_chunk(chunk, date_column, dates, amount_columns, thousands, decimal, failures),
+                              usecols=list(dict.fromkeys([date_column, *amount_columns, *text_columns])), restart=failures.clear)
+    data, encoding = read(encoding)
+    if dates.switched:
+        # a later chunk ruled out the format the earlier ones were read with, so read them again with the one that fits all
+        dates = DateParser(dates.format)
+        failures.clear()
+        data, encoding = read(encoding)
+    # categories are encoded once over the whole file, so every chunk shares one dictionary
+    data = chronological(data.astype({column: "category" for column in text_columns}), date_column)
+    return {"name": name, "data": data, "encoding": encoding, "date_format": dates.format, "rows": len(data), "parse_failures": failures,
+            "bytes_per_row": {"raw": raw_bytes_per_row(content, delimiter, encoding), "ledger": bytes_per_row(data)},
+            "seconds": time.perf_counter() - start}
+
+
+def chronological(data, date_column): #Model
+    """Return a statement oldest first, reversing it if it lists its transactions newest first.
+
+    Only the file knows the order of the transactions within a day, so the rows are kept or reversed as a
+    whole, never sorted; every day of the result then closes with its last row.
+    """
+    dates = data[date_column].dropna()
+    if len(dates) and dates.iloc[0] > dates.iloc[-1]:
+        return data.iloc[::-1].reset_index(drop=True)
+    return data
+
+
+def bytes_per_row(data): #Model
+    """Return the memory a frame takes per row, strings included."""
+    return float(data.memory_usage(deep=True).sum() / max(len(data), 1))
+
+
+def raw_bytes_per_row(content, delimiter, encoding, rows=RAW_SAMPLE_ROWS): #Model
+    """Estimate the memory per row of reading the whole statement as pandas infers it, from its first `rows` rows."""
+    try:
+        return bytes_per_row(pd.read_csv(io.BytesIO(content), delimiter=delimiter, encoding=encoding, nrows=rows))
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def parse_statements(files, *settings, max_workers=None): #Model
+    """Run parse_statement on every (name, bytes) pair in `files`, in parallel worker processes when there are several.
+
+    `settings` are the remaining arguments of parse_statement. Results come back in the order of `files`.
+    """
+    if len(files) == 1:
+        return [parse_statement(*files[0], *settings)]
+    max_workers = min(len(files), max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(parse_statement, name, content, *settings) for name, content in files]
+        return [future.result() for future in futures]
+
+
+def merge_statements(frames, key_columns, date_column): #Model
+    """Combine statements into one ledger, dropping transactions that appear in more than one of them.
+
+    Transactions are matched on a hash of `key_columns`. Identical transactions within one statement are
+    all kept; a later statement only adds the copies beyond those already seen, so overlapping periods are
+    counted once. The statements are oldest first, as parse_statement returns them, and are combined
+    earliest period first, so the stable sort by date keeps the order of each day's transactions. Returns
+    the ledger and the number of rows dropped.
+    """
+    if len(frames) == 1:
+        return frames[0], 0
+    # the statement covering the earlier period goes first, so a day split between two statements gets the
+    # later statement's extra transactions after the ones already seen
+    frames = sorted(frames, key=lambda frame: _first_date(frame, date_column))
+    parts = [frame.assign(**_transaction_keys(frame, key_columns)) for frame in frames]
+    merged = concat_ledgers(parts)
+    duplicated = merged.duplicated(["_key", "_occurrence"])
+    merged = merged.loc[~duplicated].drop(columns=["_key", "_occurrence"])
+    merged = merged.sort_values(date_column, kind="stable", ignore_index=True)
+    return merged, int(duplicated.sum())
+
+
+def concat_ledgers(frames): #Model
+    """Concatenate ledgers, keeping the columns that are categories in all of them as categories."""
+    data = pd.concat(frames, ignore_index=True)
+    for column in frames[0].columns:
+        if all(column in frame and isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            data[column] = union_categoricals([frame[column] for frame in frames])
+    return data
+
+
+def new_transactions(existing, frame, key_columns): #Model
+    """Return the rows of `frame` that are not in `existing`, matched the same way as merge_statements."""
+    seen = pd.MultiIndex.from_frame(pd.DataFrame(_transaction_keys(existing, key_columns)))
+    keys = pd.MultiIndex.from_frame(pd.DataFrame(_transaction_keys(frame, key_columns)))
+    return frame.loc[~keys.isin(seen)]
+
+
+def _first_date(frame, date_column):
+    first = frame[date_column].min()
+    return pd.Timestamp.max if pd.isna(first) else first
+
+
+def _transaction_keys(frame, key_columns):
+    """Hash each row of `key_columns` and number the copies of each transaction within `frame`."""
+    columns = frame[key_columns]
+    # the same day may come back from Parquet with another datetime resolution
+    dates = columns.select_dtypes("datetime").columns
+    columns = columns.astype({column: "datetime64[ns]" for column in dates})
+    keys = pd.util.hash_pandas_object(columns, index=False).to_numpy()
+    occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+    return {"_key": keys, "_occurrence": occurrence}
@@ -0,0 +1,178 @@
+import json
+import os
+
+import pandas as pd
+
+from amounts import CENTS
+from chart_data import add_chart_totals, chart_totals
+from ingest import LEDGER_LAYOUT, concat_ledgers, new_transactions
+from windows import daily_totals
+
+LEDGER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ledgers")
+BALANCE_TOLERANCE = 1  # cents of difference still counted as a continuous balance
+
+
+class LedgerAggregates: #Model
+    """The sums StatementAnalysis needs, kept small enough to update instead of recompute.
+
+    - daily: per calendar day with transactions, debit and credit totals, number of debit amounts and
+      closing balance, as returned by daily_totals
+    - totals: debit and credit per (month, day, category), as returned by chart_totals
+
+    Amounts are integer cents like the ledger, so adding aggregates never accumulates rounding errors.
+    """
+
+    def __init__(self, daily, totals):
+        self.daily = daily
+        self.totals = totals
+
+    @classmethod
+    def from_data(cls, data, columns):
+        date, debit, credit, balance, category = (columns[role] for role in ("date", "debit", "credit", "balance", "category"))
+        return cls(daily_totals(data, date, debit, credit, balance), chart_totals(data, date, debit, credit, category))
+
+    def add(self, other, balance_column):
+        """Return the aggregates of both sets of transactions; the closing balances of `other` win on days in both."""
+        sums = [column for column in self.daily.columns if column != balance_column]
+        daily = self.daily[sums].add(other.daily[sums], fill_value=0)
+        daily[balance_column] = other.daily[balance_column].combine_first(self.daily[balance_column])
+        daily.index.name = self.daily.index.name
+        return LedgerAggregates(daily[self.daily.columns], add_chart_totals(self.totals, other.totals))
+
+
+class LedgerStore: #Model
+    """A statement history kept on disk, so a new statement only costs as much as its own transactions.
+
+    The transactions are stored as one Parquet part per append, listed in `manifest.json` with their
+    first and last day; the LedgerAggregates are stored next to them and updated on every append.
+    """
+
+    def __init__(self, name="default", directory=LEDGER_DIR):
+        self.directory = os.path.join(directory, name)
+        self.manifest = self._read_manifest()
+
+    def exists(self):
+        return self.manifest is not None
+
+    def aggregates(self):
+        """Load the stored LedgerAggregates."""
+        version = self.manifest["version"]
+        daily = pd.read_parquet(os.path.join(self.directory, f"daily-{version:05d}.parquet"))
+        totals = pd.read_parquet(os.path.join(self.directory, f"totals-{version:05d}.parquet"))
+        return LedgerAggregates(daily.set_index(self.manifest["columns"]["date"]), totals.set_index(list(totals.columns[:3])))
+
+    def transactions(self, start=None, end=None):
+        """Return the stored transactions sorted by date, only reading the parts that overlap the days [start, end]."""
+        date = self.manifest["columns"]["date"]
+        parts = []
+        # parts in the order of their days, so a day two statements share keeps its transactions in order
+        for part in sorted(self.manifest["parts"], key=lambda part: (part["first"], part["last"])):
+            if (start is None or pd.Timestamp(part["last"]) >= start) and (end is None or pd.Timestamp(part["first"]) <= end):
+                frame = pd.read_parquet(os.path.join(self.directory, part["file"]))
+                days = frame[date].dt.normalize()
+                if start is not None:
+                    frame, days = frame[days >= start], days[days >= start]
+                if end is not None:
+                    frame = frame[days <= end]
+                parts.append(frame)
+        if not parts:
+            return pd.DataFrame()
+        return concat_ledgers(parts).sort_values(date, kind="stable", ignore_index=True)
+
+    def append(self, data, columns, key_columns):
+        """Add the transactions of `data` that are not stored yet and update the aggregates with them alone.
+
+        Returns a report with the rows read, added and already stored, the days the statement overlaps the
+        history, the days between them, and how far the balance is off from continuing the stored one
+        (in currency units, None when it cannot be checked).
+        """
+        date, debit, credit, balance = columns["date"], columns["debit"], columns["credit"], columns["balance"]
+        report = {"rows": len(data), "added": len(data), "duplicates": 0, "overlap_days": 0, "gap_days": 0, "balance_gap": None}
+        if not len(data):
+            return report
+        days = data[date].dt.normalize()
+        first, last = days.min(), days.max()
+        manifest = self.manifest or {"columns": columns, "amounts": "cents", "layout": LEDGER_LAYOUT, "parts": [], "version": 0}
+        if self.manifest is None:
+            aggregates = LedgerAggregates.from_data(data, columns)
+            added = data
+        else:
+            if manifest["columns"] != columns:
+                raise ValueError("The saved history was built with other columns; clear it or match the same columns.")
+            if manifest.get("amounts") != "cents" or manifest.get("layout") != LEDGER_LAYOUT:
+                raise ValueError("The saved history was stored in an older format; clear it and add the statements again.")
+            stored = self.aggregates()
+            stored_last = stored.daily.index.max()
+            # only the stored transactions on the statement's own days can be duplicates
+            existing = self.transactions(first, last)
+            added = new_transactions(existing, data, key_columns) if len(existing) else data
+            new_days = daily_totals(data, date, debit, credit, balance)
+            report.update(
+                added=len(added),
+                duplicates=len(data) - len(added),
+                overlap_days=int(stored.daily.index.isin(new_days.index).sum()),
+                gap_days=max((first - stored_last).days - 1, 0),
+                balance_gap=self._balance_gap(stored.daily, new_days, added, date, debit, credit, balance),
+            )
+            if not len(added):
+                return report
+            delta = LedgerAggregates.from_data(added, columns)
+            # the statement knows the closing balance of all its days, not only those with new rows
+            delta.daily = delta.daily.reindex(new_days.index).fillna({column: 0 for column in delta.daily.columns if column != balance})
+            delta.daily[balance] = new_days[balance]
+            # a statement may stop during its last day; if the history goes on past that day, it knows how the day closed
+            if stored_last > last and last in stored.daily.index:
+                delta.daily.loc[last, balance] = stored.daily.loc[last, balance]
+            aggregates = stored.add(delta, balance)
+        # every append writes new files and switches to them in the manifest last,
+        # so an interrupted append leaves the previous history readable
+        os.makedirs(self.directory, exist_ok=True)
+        previous = manifest["version"]
+        version = previous + 1
+        added_days = added[date].dt.normalize()
+        self._write(added, f"part-{version:05d}.parquet")
+        self._write(aggregates.daily.reset_index(), f"daily-{version:05d}.parquet")
+        self._write(aggregates.totals.reset_index(), f"totals-{version:05d}.parquet")
+        manifest = dict(manifest, version=version, parts=manifest["parts"] + [
+            {"file": f"part-{version:05d}.parquet", "rows": len(added), "first": str(added_days.min().date()), "last": str(added_days.max().date())}])
+        with open(os.path.join(self.directory, "manifest.json.tmp"), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(os.path.join(self.directory, "manifest.json.tmp"), os.path.join(self.directory, "manifest.json"))
+        self.manifest = manifest
+        for name in (f"daily-{previous:05d}.parquet", f"totals-{previous:05d}.parquet"):
+            if os.path.exists(os.path.join(self.directory, name)):
+                os.remove(os.path.join(self.directory, name))
+        return report
+
+    def clear(self):
+        """Delete the stored history."""
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
+            os.rmdir(self.directory)
+        self.manifest = None
+
+    def _balance_gap(self, stored, new_days, added, date, debit, credit, balance):
+        """Compare the statement's first closing balance with the stored one carried over that day's new transactions."""
+        first = new_days.index[0]
+        before = stored.loc[stored.index < first, balance].dropna()
+        if before.empty or pd.isna(new_days[balance].iloc[0]):
+            return None
+        # the day's stored transactions, plus the ones this statement adds
+        same_day = stored[debit].get(first, 0), stored[credit].get(first, 0)
+        added_day = added[added[date].dt.normalize() == first]
+        expected = before.iloc[-1] - same_day[0] - added_day[debit].sum() + same_day[1] + added_day[credit].sum()
+        gap = round(float(new_days[balance].iloc[0] - expected))
+        return 0.0 if abs(gap) <= BALANCE_TOLERANCE else gap / CENTS
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, "manifest.json"), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, frame, name):
+        path = os.path.join(self.directory, name)
+        frame.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
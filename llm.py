@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from disk_cache import evict_oldest, remove_file, temporary_path
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses")
+RESPONSE_TTL = 7 * 24 * 60 * 60  # seconds a cached answer stays valid
+MAX_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def fingerprint(data): #Model
+    """Hash the contents of a DataFrame without formatting it as text."""
+    if data is None:
+        return ""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    digest.update(json.dumps([str(column) for column in data.columns]).encode())
+    return digest.hexdigest()
+
+
+class ResponseCache: #Model
+    """GPT answers stored as JSON files keyed on the model, temperature, prompt and statement fingerprint.
+
+    Entries older than `ttl` seconds are ignored and deleted; the oldest entries are evicted once
+    the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=RESPONSE_TTL, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, model, temperature, prompt, data_fingerprint):
+        payload = json.dumps([model, temperature, prompt, data_fingerprint])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached answer for `key`, or None if it is missing or expired."""
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if time.time() - entry["created"] > self.ttl:
+            remove_file(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["text"]
+
+    def put(self, key, text):
+        """Store an answer and evict the oldest entries if the cache is over its size limit."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temporary = temporary_path(path)
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"created": time.time(), "text": text}, file)
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        """Delete the oldest files until the cache fits in `max_bytes`."""
+        evict_oldest(self.directory, ".json", self.max_bytes)
+
+
+class AnswerStreams: #Model
+    """Run several token generators on worker threads and hand their tokens back to the calling thread.
+
+    Streamlit elements may only be updated from the script thread, so the workers only produce tokens
+    and `drain` is iterated on the script thread to write them into the page. The seconds until the
+    first token and until the end of each stream are kept in `timings`.
+    """
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.queue = queue.Queue()
+        self.pending = 0
+        self.timings = {}
+
+    def submit(self, name, stream, *args):
+        """Start consuming `stream(*args)` in the background, tagging its tokens with `name`."""
+        start = time.perf_counter()
+        timing = self.timings[name] = {"first_token": None, "seconds": None}
+        def work():
+            try:
+                for token in stream(*args):
+                    if timing["first_token"] is None:
+                        timing["first_token"] = time.perf_counter() - start
+                    self.queue.put((name, token, None))
+                timing["seconds"] = time.perf_counter() - start
+                self.queue.put((name, None, None))
+            except Exception as error:
+                timing["seconds"] = time.perf_counter() - start
+                self.queue.put((name, None, error))
+        self.pending += 1
+        self.executor.submit(work)
+
+    def drain(self):
+        """Yield (name, token, error) in arrival order until every stream has finished.
+
+        A finished stream yields nothing more; a failed one yields a single item with its error.
+        """
+        while self.pending:
+            name, token, error = self.queue.get()
+            if token is None:
+                self.pending -= 1
+                if error is None:
+                    continue
+            yield name, token, error
+        self.executor.shutdown(wait=False)
+
+
+# Kept at module level so the hit/miss counters survive Streamlit reruns
+response_cache = ResponseCache()
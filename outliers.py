@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+OUTLIER_THRESHOLD = 3.5  # robust z-score above which an expense is unusual for its category
+MIN_CATEGORY_EXPENSES = 5  # smaller categories are compared with all the expenses instead
+MAD_SCALE = 1.4826  # the median absolute deviation of normal amounts times this is their standard deviation
+MEAN_AD_SCALE = 1.2533  # the same for the mean absolute deviation, used where the MAD is 0
+TYPICAL_COLUMN = "Typical amount"
+SCORE_COLUMN = "Score"
+
+
+def group_medians(codes, values, groups): #Model
+    """Return the median of `values` per group code 0..groups-1 with one sort, NaN for empty groups."""
+    if len(values) == 0:
+        return np.full(groups, np.nan)
+    # sorted by amount, then stably by group; the integer sort of small codes is much faster than a lexsort
+    order = np.argsort(values, kind="stable")
+    ordered = values[order[np.argsort(codes[order], kind="stable")]]
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.cumsum(counts) - counts
+    # the two middle values of each group, which are the same value for odd counts
+    low = ordered[np.clip(starts + (counts - 1) // 2, 0, len(values) - 1)]
+    high = ordered[np.clip(starts + counts // 2, 0, len(values) - 1)]
+    return np.where(counts > 0, (low + high) / 2, np.nan)
+
+
+class ExpenseScores: #Model
+    """How unusual every expense is for its category, from robust per-category baselines.
+
+    Each category's baseline is the median of its expenses and their spread the median absolute
+    deviation, so a few very large expenses do not hide each other the way they inflate a mean and a
+    standard deviation. Categories with fewer than MIN_CATEGORY_EXPENSES expenses use the baseline of
+    all the expenses. The score is the robust z-score (amount - median) / (MAD * MAD_SCALE); the medians
+    and deviations of all the categories come from sorting the expenses by category once for each.
+    """
+
+    def __init__(self, data, debit_column, category_column=None):
+        amounts = data[debit_column].to_numpy(dtype=float, na_value=np.nan)
+        self.rows = np.flatnonzero(amounts > 0)
+        values = amounts[self.rows]
+        if category_column is None:
+            codes, groups = np.zeros(len(values), dtype=np.intp), 1
+        else:
+            # missing categories are one more group
+            codes, uniques = pd.factorize(data[category_column].iloc[self.rows], use_na_sentinel=False)
+            groups = len(uniques)
+        counts = np.bincount(codes, minlength=groups)
+        medians = group_medians(codes, values, groups)
+        deviations = np.abs(values - medians[codes])
+        scales = _scales(group_medians(codes, deviations, groups), np.bincount(codes, deviations, minlength=groups), counts)
+        overall_median = np.median(values) if len(values) else np.nan
+        overall_deviations = np.abs(values - overall_median)
+        overall_scale = _scales(np.median(overall_deviations) if len(values) else np.nan, overall_deviations.sum(), len(values))
+        small = counts < MIN_CATEGORY_EXPENSES
+        medians[small], scales[small] = overall_median, overall_scale
+        self.medians = medians[codes]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # identical amounts have no spread; anything above them then scores infinite
+            self.scores = np.where(scales[codes] > 0, (values - self.medians) / scales[codes], np.where(values > self.medians, np.inf, 0.0))
+        self.amounts = values
+
+    def count(self, threshold=OUTLIER_THRESHOLD):
+        """Return the number of expenses scoring above `threshold`."""
+        return int((self.scores > threshold).sum())
+
+    def top(self, data, limit, threshold=OUTLIER_THRESHOLD):
+        """Return the rows of `data` for the `limit` highest scoring expenses above `threshold`, most unusual first.
+
+        The rows get TYPICAL_COLUMN, the median of their category, and SCORE_COLUMN. Only the selected
+        rows are sorted; the rest are cut off with a partial selection.
+        """
+        candidates = np.flatnonzero(self.scores > threshold)
+        if limit < len(candidates):
+            candidates = candidates[np.argpartition(-self.scores[candidates], limit - 1)[:limit]]
+        # most unusual first, larger amounts first among equal scores
+        candidates = candidates[np.lexsort((-self.amounts[candidates], -self.scores[candidates]))]
+        return data.iloc[self.rows[candidates]].assign(**{TYPICAL_COLUMN: self.medians[candidates], SCORE_COLUMN: self.scores[candidates]})
+
+
+def _scales(mads, absolute_deviations, counts):
+    """Turn median absolute deviations into standard deviations, using the mean absolute deviation where the MAD is 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_deviations = np.asarray(absolute_deviations, dtype=float) / counts
+    mads = np.asarray(mads, dtype=float)
+    return np.where(mads > 0, mads * MAD_SCALE, mean_deviations * MEAN_AD_SCALE)
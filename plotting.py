@@ -0,0 +1,113 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+CHART_MODES = ("Auto", "Full detail", "Fast")
+POINT_THRESHOLD = 5000  # above this many transactions "Auto" switches to the fast figure
+MAX_LINE_POINTS = 2000  # balance points kept by the downsampling
+MAX_DAILY_BARS = 1500  # days shown as daily bars; longer statements get weekly bars
+
+
+def lttb(x, y, threshold): #Model
+    """Return the indices of `threshold` points chosen by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each bucket in between, the point forming the largest
+    triangle with the previously kept point and the average of the next bucket, so peaks and dips survive.
+    `x` must be sorted.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # boundaries of the threshold - 2 buckets between the first and last point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        average_x = x[end:next_end].mean()
+        average_y = y[end:next_end].mean()
+        area = np.abs((x[previous] - average_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def bucket_bars(dates, values, freq): #Model
+    """Sum `values` per day ('D') or week ('W'), labelled with the first day of each bucket."""
+    buckets = dates.dt.to_period(freq).dt.start_time
+    return values.groupby(buckets).sum()
+
+
+def bar_frequency(dates, max_daily_bars=MAX_DAILY_BARS): #Model
+    """Use daily bars when the statement spans few enough days, weekly bars otherwise."""
+    span = (dates.max() - dates.min()).days + 1
+    return "D" if span <= max_daily_bars else "W"
+
+
+def cumulative_figure(data, date_column, debit_column, credit_column, balance_column, mode="Auto"): #View
+    """Build the earnings, expenses and balance figure.
+
+    "Full detail" draws one bar per transaction and every balance point. "Fast" draws daily or weekly
+    bars and a WebGL balance line downsampled with LTTB. "Auto" picks "Fast" above POINT_THRESHOLD rows.
+    """
+    if mode == "Auto":
+        mode = "Fast" if len(data) > POINT_THRESHOLD else "Full detail"
+    fig = go.Figure()
+    if mode == "Full detail":
+        # add a trace for earnings
+        fig.add_trace(go.Bar(x=data[date_column], y=data[credit_column], name='Earnings', marker=dict(color='green')))
+        # add a trace for expenses
+        fig.add_trace(go.Bar(x=data[date_column], y=data[debit_column], name='Expenses', marker=dict(color='red')))
+        # add a trace for the balance
+        fig.add_trace(go.Scatter(x=data[date_column], y=data[balance_column], name='Balance', mode='lines', marker=dict(color='blue')))
+    else:
+        dates = data[date_column]
+        freq = bar_frequency(dates)
+        earnings = bucket_bars(dates, data[credit_column], freq)
+        expenses = bucket_bars(dates, data[debit_column], freq)
+        label = "daily" if freq == "D" else "weekly"
+        fig.add_trace(go.Bar(x=earnings.index, y=earnings.values, name=f'Earnings ({label})', marker=dict(color='green')))
+        fig.add_trace(go.Bar(x=expenses.index, y=expenses.values, name=f'Expenses ({label})', marker=dict(color='red')))
+        balance = data[[date_column, balance_column]].dropna().sort_values(date_column, kind="stable")
+        keep = lttb(balance[date_column].to_numpy(dtype="datetime64[ns]").astype(np.int64), balance[balance_column].to_numpy(), MAX_LINE_POINTS)
+        balance = balance.iloc[keep]
+        fig.add_trace(go.Scattergl(x=balance[date_column], y=balance[balance_column], name='Balance', mode='lines', marker=dict(color='blue')))
+    # set the layout for the legend
+    fig.update_layout(showlegend=True, legend=dict(title=dict(text='Legend'), orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1))
+    return fig
+
+
+def compare_modes(rows, seed=0): #Model
+    """Build the figure in both modes for a random statement of `rows` transactions and measure it.
+
+    Returns, per mode, the seconds spent building and serializing the figure and the size of the JSON
+    sent to the browser.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("today").normalize() - pd.to_timedelta(np.sort(rng.integers(0, 5 * 365, rows))[::-1], unit="D")
+    debit = np.where(rng.random(rows) < 0.8, rng.gamma(2, 30, rows).round(2), 0.0)
+    credit = np.where(debit == 0, rng.gamma(2, 150, rows).round(2), 0.0)
+    data = pd.DataFrame({"date": dates, "debit": debit, "credit": credit, "balance": 5000 + np.cumsum(credit - debit)})
+    results = {}
+    for mode in ("Full detail", "Fast"):
+        start = time.perf_counter()
+        payload = cumulative_figure(data, "date", "debit", "credit", "balance", mode).to_json()
+        results[mode] = {"seconds": time.perf_counter() - start, "bytes": len(payload)}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the full and fast 'Cumulative Earnings and Spending' figures.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 500000])
+    args = parser.parse_args()
+    for rows in args.rows:
+        for mode, result in compare_modes(rows).items():
+            print(f"{rows:>9,} rows  {mode:<12} {result['seconds']:8.2f} s  {result['bytes'] / 1e6:8.2f} MB")
@@ -0,0 +1,151 @@
+import math
+
+from amounts import to_units
+from outliers import SCORE_COLUMN, TYPICAL_COLUMN
+
+TOP_TRANSACTIONS = 25  # largest expenses listed in every prompt
+MAX_MAP_CHUNKS = 8  # most chunks summarized in map-reduce mode
+MAP_SUMMARY_TOKENS = 150  # answer length for each chunk summary
+MAP_PROMPT = ("You are a bank statement financial analist. Summarize the transactions below in a few short lines: "
+              "the main spending categories, recurring payments and any unusual amounts, with their numbers.")
+
+
+def estimate_tokens(text): #Model
+    """Estimate the number of tokens in a text, at about 4 characters per token."""
+    return math.ceil(len(text) / 4)
+
+
+def build_context(data, columns, budget): #Model
+    """Describe a statement for the GPT prompt in at most `budget` tokens.
+
+    `columns` maps the roles date, debit, credit, balance, category and description to column names.
+    Instead of the raw table the prompt gets, in order of priority, the monthly totals, the expenses per
+    category, the largest expenses and the most recent transactions, each as compact CSV with only the
+    mapped columns. Sections are filled row by row until the budget runs out. Amounts in the ledger are
+    in cents and are written in currency units.
+
+    Returns the text and a report of what was included.
+    """
+    report = {"budget": budget, "tokens": 0, "sections": [], "complete": True}
+    if data is None or data.empty or budget <= 0:
+        return "", report
+    data = _transactions(data, columns)
+    # no section can show more rows than fit in the budget, so never format more than that
+    max_rows = max(budget * 4 // 20, 1)
+    parts = []
+    for title, frame, available in _sections(data, columns, max_rows):
+        # one token is kept for the blank line between sections
+        text, rows, tokens = _fit(title, frame, budget - report["tokens"] - 1)
+        if text:
+            parts.append(text)
+            report["tokens"] += tokens + 1
+        report["sections"].append({"name": title, "rows": rows, "of": available})
+        report["complete"] = report["complete"] and rows == available
+    return "\n\n".join(parts), report
+
+
+def outlier_context(outliers, columns, budget): #Model
+    """Describe the most unusual expenses, as returned by StatementAnalysis.outliers, in at most `budget` tokens.
+
+    The rows are not a whole statement, so unlike build_context no totals are derived from them: the table
+    is sent once as compact CSV, with the date, description, category and debit, the typical amount of the
+    category and the score. Returns the text and a report like build_context's.
+    """
+    title = "Unusual expenses (most unusual first)"
+    report = {"budget": budget, "tokens": 0, "sections": [], "complete": True}
+    if outliers is None or outliers.empty or budget <= 0:
+        return "", report
+    names = list(dict.fromkeys(columns[role] for role in ("date", "description", "category", "debit")
+                               if columns.get(role) is not None and columns[role] in outliers.columns))
+    frame = to_units(outliers[names + [TYPICAL_COLUMN, SCORE_COLUMN]], [columns["debit"], TYPICAL_COLUMN])
+    text, rows, tokens = _fit(title, frame, budget)
+    report.update(tokens=tokens, sections=[{"name": title, "rows": rows, "of": len(frame)}], complete=rows == len(frame))
+    return text, report
+
+
+def transaction_chunks(data, columns, budget, max_chunks=MAX_MAP_CHUNKS, rows_per_slice=2000): #Model
+    """Split the transactions, most recent first, into CSV chunks of at most `budget` tokens each.
+
+    Stops after `max_chunks` chunks. Rows are formatted a slice at a time so the whole table is never
+    held as one string.
+    """
+    frame = _transactions(data, columns).sort_values(columns["date"], ascending=False)
+    header = _lines(frame.head(0))[0]
+    chunk, used, count = [header], estimate_tokens(header), 0
+    for start in range(0, len(frame), rows_per_slice):
+        for line in _lines(frame.iloc[start:start + rows_per_slice])[1:]:
+            cost = estimate_tokens(line + "\n")
+            if used + cost > budget and len(chunk) > 1:
+                yield "\n".join(chunk)
+                count += 1
+                if count == max_chunks:
+                    return
+                chunk, used = [header], estimate_tokens(header)
+            chunk.append(line)
+            used += cost
+    if len(chunk) > 1:
+        yield "\n".join(chunk)
+
+
+def describe_report(report): #View
+    """Summarize a build_context report in one line."""
+    if report.get("cached"):
+        return "Cached answer."
+    if not report.get("sections"):
+        return "No statement data was sent."
+    sections = ", ".join(f"{section['name']} {section['rows']}/{section['of']} rows" for section in report["sections"])
+    text = f"Sent about {report['tokens']:,} of {report['budget']:,} tokens: {sections}."
+    if report.get("chunks"):
+        text += f" Plus summaries of {report['chunks']} chunks of transactions."
+    return text
+
+
+def _transactions(data, columns):
+    """Keep only the mapped columns that exist, in a fixed order, with the amounts in currency units."""
+    roles = ("date", "description", "category", "debit", "credit", "balance")
+    names = []
+    for role in roles:
+        name = columns.get(role)
+        if name is not None and name in data.columns and name not in names:
+            names.append(name)
+    return to_units(data[names], [columns.get(role) for role in ("debit", "credit", "balance")])
+
+
+def _sections(data, columns, max_rows):
+    """Yield (title, frame, total rows) for each part of the context, most important first, from the transactions
+    as returned by _transactions."""
+    date, debit, credit, category = columns["date"], columns["debit"], columns["credit"], columns.get("category")
+    month = data[date].dt.to_period("M").astype(str)
+    monthly = data.groupby(month).agg(earnings=(credit, "sum"), expenses=(debit, "sum"), transactions=(debit, "size"))
+    monthly = monthly.sort_index(ascending=False).reset_index(names="month")
+    yield "Monthly totals (most recent first)", monthly.head(max_rows), len(monthly)
+    if category is not None and category in data.columns:
+        categories = data.groupby(category, observed=True).agg(expenses=(debit, "sum"), transactions=(debit, "size"))
+        categories = categories.sort_values("expenses", ascending=False).reset_index()
+        yield "Expenses per category", categories.head(max_rows), len(categories)
+    largest = data.loc[data[debit].nlargest(min(TOP_TRANSACTIONS, max_rows)).index]
+    yield "Largest expenses", largest, min(TOP_TRANSACTIONS, len(data))
+    recent = data.loc[data[date].nlargest(max_rows).index]
+    yield "Most recent transactions", recent, len(data)
+
+
+def _fit(title, frame, budget):
+    """Format a section, adding rows until `budget` tokens are used. Returns the text, rows and tokens used."""
+    lines = _lines(frame)
+    header = f"{title}:\n{lines[0]}"
+    used = estimate_tokens(header + "\n")
+    if used > budget:
+        return "", 0, 0
+    included = [header]
+    for line in lines[1:]:
+        cost = estimate_tokens(line + "\n")
+        if used + cost > budget:
+            break
+        included.append(line)
+        used += cost
+    return "\n".join(included), len(included) - 1, used
+
+
+def _lines(frame):
+    """Format a frame as CSV lines, header first, with dates as days and amounts with 2 decimals."""
+    return frame.to_csv(index=False, float_format="%.2f", date_format="%Y-%m-%d").splitlines()
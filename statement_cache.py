@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from disk_cache import evict_oldest, temporary_path
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "statements")
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class StatementCache: #Model
+    """Cleaned ledgers stored as Parquet files named after a hash of the upload and the settings used to parse it.
+
+    Files are evicted least recently used first once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, files, **settings):
+        """Hash the bytes of `files`, in order, together with the parsing settings."""
+        digest = hashlib.sha256()
+        for file in files:
+            content = hashlib.sha256()
+            file.seek(0)
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                content.update(block)
+            file.seek(0)
+            digest.update(content.digest())
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key):
+        """Return the cached ledger for `key`, or None."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            data = pd.read_parquet(path)
+        except (OSError, ValueError):
+            # a half-written or corrupt file is treated as a miss and rebuilt
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass  # evicted by another thread since it was read
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store a ledger and evict old entries if the cache is over its size limit."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temporary = temporary_path(path)
+        data.to_parquet(temporary, index=False)
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used files until the cache fits in `max_bytes`."""
+        evict_oldest(self.directory, ".parquet", self.max_bytes)
+
+
+# Streamlit re-executes app.py on every interaction but keeps imported modules,
+# so this instance (and its hit/miss counters) lives for the whole server session.
+statement_cache = StatementCache()
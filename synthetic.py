@@ -0,0 +1,138 @@
+"""Generate realistic synthetic bank statements for benchmarks and demos.
+
+    python synthetic.py statement.csv --rows 1000000 --seed 1
+
+The CSV uses the app's defaults: ';' delimiter, dates as %d-%m-%Y, European amounts like 1.234,56,
+newest transaction first, and Date, Description, Debit, Credit, Balance and Category columns.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = {"date": "Date", "description": "Description", "debit": "Debit", "credit": "Credit",
+           "balance": "Balance", "category": "Category"}
+DATE_FORMAT = "%d-%m-%Y"
+# category -> (share of expenses, typical amount, merchants)
+EXPENSES = {
+    "Groceries": (0.30, 35, ["PINGO DOCE", "CONTINENTE", "LIDL", "MINIPRECO", "MERCADONA"]),
+    "Restaurants": (0.18, 18, ["CAFÉ CENTRAL", "PASTELARIA BÉNARD", "MCDONALDS", "UBER EATS", "GLOVO"]),
+    "Transport": (0.15, 22, ["UBER *TRIP", "BOLT.EU", "GALP", "REPSOL", "CP COMBOIOS"]),
+    "Shopping": (0.12, 60, ["AMAZON EU", "FNAC", "ZARA", "IKEA", "WORTEN"]),
+    "Leisure": (0.10, 25, ["NETFLIX.COM", "SPOTIFY", "CINEMA NOS", "STEAM GAMES"]),
+    "Utilities": (0.08, 70, ["EDP COMERCIAL", "EPAL AGUAS", "MEO", "VODAFONE"]),
+    "Health": (0.07, 45, ["FARMACIA SAUDE", "CUF HOSPITAL", "WELLS"]),
+}
+INCOME = {"Salary": (0.6, 2400, ["SALARIO ACME LDA"]), "Transfers": (0.4, 300, ["TRF DE JOAO SILVA", "MBWAY DE ANA COSTA"])}
+INCOME_SHARE = 0.05  # share of transactions that are credits
+# digit groups for format_european
+_PLAIN = np.array([str(number) for number in range(1000)], dtype=object)
+_PADDED = np.array([f"{number:03d}" for number in range(1000)], dtype=object)
+_FRACTIONS = np.array([f",{number:02d}" for number in range(100)], dtype=object)
+
+
+def generate_amounts(rows, seed=0, end=None, days=None): #Model
+    """Generate the statement as numbers: one row per transaction, newest first.
+
+    Returns a DataFrame with datetime `Date`, float `Debit`, `Credit` and `Balance`, and categorical
+    `Category` and `Description` columns.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("today").normalize() if end is None else pd.Timestamp(end)
+    # about five transactions a day, but no more than ten years of history
+    days = days or min(3650, max(30, rows // 5))
+    offsets = np.sort(rng.integers(0, days, rows))
+    dates = end - pd.to_timedelta(offsets, unit="D")
+
+    income = rng.random(rows) < INCOME_SHARE
+    categories, merchants, typical = _choices(rng, rows, EXPENSES)
+    income_categories, income_merchants, income_typical = _choices(rng, rows, INCOME)
+    categories = np.where(income, income_categories, categories)
+    merchants = np.where(income, income_merchants, merchants)
+    amounts = rng.lognormal(np.log(np.where(income, income_typical, typical)), 0.6)
+    debit = np.round(np.where(income, 0.0, amounts), 2)
+    credit = np.where(income, amounts, 0.0)
+    # earn about 2% more than is spent, so the balance drifts instead of exploding
+    if credit.sum() > 0:
+        credit = credit * (debit.sum() * 1.02 / credit.sum())
+    credit = np.round(credit, 2)
+    # balance after each transaction, accumulated from the oldest (last) row
+    balance = 2500 + np.cumsum((credit - debit)[::-1])[::-1]
+
+    references = rng.integers(1000, 9999, rows).astype(str)
+    descriptions = pd.Series(merchants).str.cat(references, sep=" ")
+    return pd.DataFrame({
+        COLUMNS["date"]: dates,
+        COLUMNS["description"]: descriptions.astype("category"),
+        COLUMNS["debit"]: debit,
+        COLUMNS["credit"]: credit,
+        COLUMNS["balance"]: np.round(balance, 2),
+        COLUMNS["category"]: pd.Categorical(categories),
+    })
+
+
+def format_statement(data): #Model
+    """Format generated numbers as the text a bank export would contain."""
+    text = data.copy()
+    # statements repeat dates heavily, so each distinct day is formatted once
+    codes, days = pd.factorize(data[COLUMNS["date"]])
+    text[COLUMNS["date"]] = days.strftime(DATE_FORMAT).to_numpy(dtype=object)[codes]
+    for column in (COLUMNS["debit"], COLUMNS["credit"], COLUMNS["balance"]):
+        text[column] = format_european(data[column])
+    # an empty cell instead of 0,00 on the side the transaction is not on
+    text.loc[data[COLUMNS["debit"]] == 0, COLUMNS["debit"]] = ""
+    text.loc[data[COLUMNS["credit"]] == 0, COLUMNS["credit"]] = ""
+    return text
+
+
+def format_european(values): #Model
+    """Format floats like 1.234,56, vectorized with lookup tables for each group of digits."""
+    cents = np.round(values.to_numpy() * 100).astype(np.int64)
+    negative = cents < 0
+    cents = np.abs(cents)
+    euros = cents // 100
+    text = _FRACTIONS[cents % 100]
+    # add groups of three digits from the right; only the leftmost group is not zero-padded
+    group = euros % 1000
+    rest = euros // 1000
+    text = np.where(rest > 0, _PADDED[group], _PLAIN[group]) + text
+    while (rest > 0).any():
+        group = rest % 1000
+        rest = rest // 1000
+        text = np.where(group + rest > 0, np.where(rest > 0, _PADDED[group], _PLAIN[group]) + "." + text, text)
+    return np.where(negative, "-" + text, text)
+
+
+def write_statement(path, rows, seed=0, end=None, delimiter=";", encoding="cp1252", chunk_rows=1000000): #Model
+    """Generate a statement and write it as CSV, formatting `chunk_rows` rows at a time."""
+    data = generate_amounts(rows, seed, end)
+    for start in range(0, max(rows, 1), chunk_rows):
+        chunk = format_statement(data.iloc[start:start + chunk_rows])
+        chunk.to_csv(path, sep=delimiter, encoding=encoding, index=False, mode="w" if start == 0 else "a", header=start == 0)
+    return path
+
+
+def _choices(rng, rows, table):
+    """Pick a category, merchant and typical amount per row from a table of weighted categories."""
+    names = list(table)
+    weights = np.array([table[name][0] for name in names])
+    picked = rng.choice(len(names), rows, p=weights / weights.sum())
+    categories = np.array(names, dtype=object)[picked]
+    typical = np.array([table[name][1] for name in names], dtype=float)[picked]
+    merchants = np.empty(rows, dtype=object)
+    for index, name in enumerate(names):
+        mask = picked == index
+        options = np.array(table[name][2], dtype=object)
+        merchants[mask] = options[rng.integers(0, len(options), mask.sum())]
+    return categories, merchants, typical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--end", default=None, help="date of the newest transaction (default: today)")
+    parser.add_argument("--encoding", default="cp1252")
+    args = parser.parse_args()
+    write_statement(args.path, args.rows, args.seed, args.end, encoding=args.encoding)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+class WindowIndex: #Model
+    """Sorted date index with cumulative sums, so any [start, end) total is two binary searches and a subtraction."""
+
+    def __init__(self, data, date_column, columns):
+        dates = data[date_column].to_numpy(dtype="datetime64[ns]")
+        order = np.argsort(dates, kind="stable")
+        self.dates = dates[order]
+        self.cumulative = {}
+        for column in columns:
+            # missing amounts count as 0, the same as DataFrame.sum() skipping them; integer cents stay exact
+            dtype = np.int64 if pd.api.types.is_integer_dtype(data[column].dtype) else float
+            values = data[column].to_numpy(dtype=dtype, na_value=0)[order]
+            self.cumulative[column] = np.concatenate((np.zeros(1, dtype=dtype), np.cumsum(values)))
+
+    def position(self, date):
+        """Return the number of rows dated strictly before `date`."""
+        return np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date), "ns"), side="left")
+
+    def sum(self, column, start, end):
+        """Sum `column` over the half-open date range [start, end)."""
+        cumulative = self.cumulative[column]
+        return cumulative[self.position(end)] - cumulative[self.position(start)]
+
+    def compare(self, column, end, days):
+        """Return the total for the `days` before `end`, the total for the `days` before that, and the relative delta."""
+        middle = end - pd.Timedelta(days=days)
+        start = middle - pd.Timedelta(days=days)
+        current = self.sum(column, middle, end)
+        previous = self.sum(column, start, middle)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = 1 / previous * current - 1
+        return current, previous, delta
+
+
+def daily_totals(data, date_column, debit_column, credit_column, balance_column): #Model
+    """Group the transactions by calendar day: debit and credit totals, the number of debit amounts and the closing balance.
+
+    The transactions must be oldest first, as parse_statement returns them, so each day closes with its
+    last row. Only days with transactions are included, indexed by day.
+    """
+    days = data[date_column].dt.normalize()
+    grouped = data.groupby(days)
+    daily = grouped[[debit_column, credit_column]].sum()
+    daily["debit_count"] = grouped[debit_column].count()
+    daily[balance_column] = grouped[balance_column].last()
+    return daily
+
+
+class DailyLedger: #Model
+    """The statement resampled once to one row per calendar day.
+
+    Holds the daily debit and credit totals, their running totals and the closing balance of each day
+    (carried forward over days without transactions). Comparison windows of any length are cut from it
+    without touching the transactions again. `daily` may be passed instead of grouping `data` again,
+    as returned by daily_totals.
+    """
+
+    def __init__(self, data, date_column, debit_column, credit_column, balance_column, daily=None):
+        self.date_column = date_column
+        self.debit_column = debit_column
+        self.credit_column = credit_column
+        self.balance_column = balance_column
+        if daily is None:
+            daily = daily_totals(data, date_column, debit_column, credit_column, balance_column)
+        daily = daily[[debit_column, credit_column, balance_column]].copy()
+        if len(daily):
+            daily = daily.reindex(pd.date_range(daily.index[0], daily.index[-1], name=date_column))
+        daily[[debit_column, credit_column]] = daily[[debit_column, credit_column]].fillna(0)
+        daily[balance_column] = daily[balance_column].ffill()
+        daily[f"cumulative_{debit_column}"] = daily[debit_column].cumsum()
+        daily[f"cumulative_{credit_column}"] = daily[credit_column].cumsum()
+        self.frame = daily
+
+    def window(self, start, end):
+        """Return the days in [start, end) with the debit and credit accumulated from `start` and a 1-based `day` number.
+
+        Days outside the statement are included with no transactions.
+        """
+        days = pd.date_range(start, end - pd.Timedelta(days=1), name=self.date_column)
+        window = self.frame[[self.debit_column, self.credit_column]].reindex(days).fillna(0).cumsum()
+        window["day"] = np.arange(1, len(days) + 1)
+        return window.reset_index()
+
+    def period(self, end, days):
+        """Return the windows for the `days` before `end` and the `days` before that."""
+        middle = end - pd.Timedelta(days=days)
+        return self.window(middle, end), self.window(middle - pd.Timedelta(days=days), middle)